@@ -1,16 +1,28 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.core import security
+from sqlalchemy import select
+from app.core import profiling, security
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import AsyncReadSessionLocal
 from app.db.models import User
 from app.schemas.token import TokenData
+from app.services import principal_service
+from app.services.principal_service import Principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+@profiling.timed("auth")
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Resolves the bearer token to a Principal. Repeat calls with the same token
+    are served from the principal cache without verifying the JWT again or
+    touching the database.
+    """
+    principal = principal_service.get_cached(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -24,10 +36,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.email == token_data.email).first()
+
+    user_id = payload.get("uid")
+    async with AsyncReadSessionLocal() as db:
+        if isinstance(user_id, int):
+            generation = principal_service.generation(user_id)
+            user = await db.get(User, user_id)
+            if user is not None and user.email != token_data.email:
+                user = None
+        else:
+            # Tokens issued before "uid" was added
+            result = await db.execute(select(User).filter(User.email == token_data.email))
+            user = result.scalars().first()
+            generation = principal_service.generation(user.id) if user is not None else 0
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+
+    principal = Principal.from_user(user)
+    principal_service.cache(token, principal, payload["exp"], generation)
+    return principal
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Any
 
@@ -10,21 +12,32 @@ from app.db.models import User
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.token import Token
 from app.api import deps
+from app.services.principal_service import Principal
 from app.services import auth_service
 from pydantic import BaseModel
-from app.core.limiter import limiter
+from app.core.config import settings
+from app.core.limiter import cpu_limit, limiter
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
 @limiter.limit("5/minute")
-def login_access_token(
+@cpu_limit(settings.RATE_LIMIT_COST_LOGIN)
+async def login_access_token(
     request: Request,
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+    db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    result = await db.execute(select(User).filter(User.email == form_data.username))
+    user = result.scalars().first()
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    verified, new_hash = await security.verify_and_update_async(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # Stored hash predates the current ARGON2_* settings
+        user.hashed_password = new_hash
+        await db.commit()
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -32,42 +45,44 @@ def login_access_token(
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
         ),
         "token_type": "bearer",
     }
 
 @router.post("/register", response_model=UserResponse)
 @limiter.limit("3/minute")
-def register_user(
+@cpu_limit(settings.RATE_LIMIT_COST_REGISTER)
+async def register_user(
     *,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
 ) -> Any:
-    user = db.query(User).filter(User.email == user_in.email).first()
+    result = await db.execute(select(User).filter(User.email == user_in.email))
+    user = result.scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
     
-    # Validate password strength
-    auth_service.validate_password_strength(user_in.password, user_inputs=[user_in.email])
+    # Validate password strength (zxcvbn is CPU-bound, keep it off the event loop)
+    await run_in_threadpool(auth_service.validate_password_strength, user_in.password, user_inputs=[user_in.email])
     
-    hashed_password = security.get_password_hash(user_in.password)
+    hashed_password = await security.get_password_hash_async(user_in.password)
     db_user = User(
         email=user_in.email,
         hashed_password=hashed_password,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(
-    current_user: User = Depends(deps.get_current_user),
+async def read_users_me(
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     return current_user
 
@@ -80,25 +95,26 @@ class TwoFAEnable(BaseModel):
     code: str
 
 @router.post("/2fa/setup", response_model=TwoFASetup)
-def setup_2fa(
-    current_user: User = Depends(deps.get_current_user),
+async def setup_2fa(
+    current_user: Principal = Depends(deps.get_current_user),
 ):
     secret = auth_service.generate_totp_secret()
     uri = auth_service.get_totp_uri(secret, current_user.email)
     return {"secret": secret, "uri": uri}
 
 @router.post("/2fa/enable", response_model=UserResponse)
-def enable_2fa(
+async def enable_2fa(
     payload: TwoFAEnable,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ):
     if not auth_service.verify_totp(payload.secret, payload.code):
         raise HTTPException(status_code=400, detail="Invalid 2FA code")
     
-    current_user.totp_secret = payload.secret
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    # Committing the change invalidates this user's cached principals
+    user = await db.get(User, current_user.id)
+    user.totp_secret = payload.secret
+    await db.commit()
+    await db.refresh(user)
+    return user
 
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal
 from app.services import generator_service
 from pydantic import BaseModel
 
@@ -22,3 +23,42 @@ def generate_password(
         include_symbols=symbols
     )
     return {"password": pwd, "length": len(pwd)}
+
+class GeneratedSecret(BaseModel):
+    value: str
+    entropy_bits: float
+
+class GeneratedBatch(BaseModel):
+    mode: str
+    count: int
+    results: List[GeneratedSecret]
+
+@router.get("/batch", response_model=GeneratedBatch)
+def generate_batch(
+    count: int = Query(10, ge=1, le=1000),
+    mode: Literal["password", "passphrase"] = "password",
+    length: int = Query(16, ge=8, le=128),
+    uppercase: bool = True,
+    digits: bool = True,
+    symbols: bool = True,
+    words: int = Query(6, ge=3, le=20),
+    separator: str = Query("-", max_length=3)
+):
+    """
+    Generate many passwords, or diceware passphrases (EFF large wordlist), in one request.
+    Each result reports its entropy in bits.
+    """
+    try:
+        if mode == "passphrase":
+            values = generator_service.generate_passphrases(count, words=words, separator=separator)
+            entropy = generator_service.passphrase_entropy_bits(words)
+        else:
+            values = generator_service.generate_passwords(count, length, uppercase, digits, symbols)
+            entropy = generator_service.password_entropy_bits(length, uppercase, digits, symbols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "mode": mode,
+        "count": len(values),
+        "results": [{"value": value, "entropy_bits": entropy} for value in values],
+    }
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+from app.core.config import settings
+from app.core.limiter import limiter, upload_mib
 from app.db.session import get_db
 from app.schemas.share import ShareCreate, ShareResponse, ShareContentResponse
 from app.services import share_service
@@ -7,24 +11,80 @@ from app.services import share_service
 router = APIRouter()
 
 @router.post("/create", response_model=ShareResponse)
-def create_share_link(
+async def create_share_link(
     entry: ShareCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return share_service.create_shared_secret(db, entry)
+    return await share_service.create_shared_secret(db, entry)
 
 @router.get("/{uuid}", response_model=ShareContentResponse)
-def access_share_link(
+async def access_share_link(
     uuid: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Access a shared secret.
     WARNING: This action destroys the secret on the server!
     Returns the encrypted blob. The client must decrypt it using the key fragment from the URL.
     """
-    content = share_service.access_shared_secret(db, uuid)
+    content = await share_service.access_shared_secret(db, uuid)
     if not content:
         raise HTTPException(status_code=404, detail="Link expired or already visited.")
     
     return {"encrypted_content": content}
+
+class _FileShareResponse(StreamingResponse):
+    """Runs its background task even when the client disconnects mid-stream."""
+
+    async def __call__(self, scope, receive, send):
+        background, self.background = self.background, None
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if background is not None:
+                await background()
+
+@router.post("/file", response_model=ShareResponse)
+@limiter.limit(settings.RATE_LIMIT_SHARE_FILE)
+@limiter.limit(settings.RATE_LIMIT_SHARE_FILE_MIB, cost=upload_mib)
+async def create_file_share_link(
+    request: Request,
+    filename: str = Query("file", max_length=255),
+    ttl_minutes: int = Query(60, ge=1, le=settings.SHARE_MAX_TTL_MINUTES),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Share a file. Send the raw bytes as the request body (application/octet-stream).
+    The upload is encrypted in chunks as it streams in; the file is never held in memory.
+    Uploads are limited per client in number and in MiB (by Content-Length).
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.SHARE_FILE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {settings.SHARE_FILE_MAX_BYTES} bytes")
+    try:
+        return await share_service.create_file_share(db, request.stream(), filename, ttl_minutes)
+    except share_service.ShareTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.get("/file/{uuid}")
+async def download_file_share(
+    uuid: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Download a shared file.
+    WARNING: This action destroys the file on the server!
+    Streams the encrypted file; the encrypted file name is in the X-Share-Metadata header.
+    The client decrypts both with the key fragment from the URL.
+    """
+    opened = await share_service.open_file_share(db, uuid)
+    if not opened:
+        raise HTTPException(status_code=404, detail="Link expired or already visited.")
+
+    encrypted_name, length, stream = opened
+    return _FileShareResponse(
+        stream,
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(length), "X-Share-Metadata": encrypted_name},
+        background=BackgroundTask(share_service.discard_file_share, uuid),
+    )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from app.core.executor import hash_memory_budget, kdf_executor
+from app.services import share_service, strength_service
+
+router = APIRouter()
+
+@router.get("/executor")
+def executor_stats():
+    """
+    Queue depth, rejections and queue wait times of the KDF/hashing pool.
+    """
+    return kdf_executor.stats()
+
+@router.get("/hashing")
+def hashing_stats():
+    """
+    Argon2 memory budget: bytes in use, hashes admitted and queued, and how many were shed.
+    """
+    return hash_memory_budget.stats()
+
+@router.get("/strength")
+def strength_stats():
+    """
+    Call counts, cache hits and zxcvbn timings of the strength engine.
+    """
+    return strength_service.stats()
+
+@router.get("/share-reaper")
+def share_reaper_stats():
+    """
+    Runs, rows reaped and last run duration of the expired share link reaper.
+    """
+    return share_service.reaper_stats()
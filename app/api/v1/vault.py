@@ -1,67 +1,177 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 
-from app.db.session import get_db
-from app.db.models import User
+from app.db.session import get_db, get_read_db
 from app.api import deps
+from app.core.config import settings
+from app.core.limiter import cpu_limit
+from app.services.principal_service import Principal
 from app.schemas.vault import (
     VaultEntryCreate, 
     VaultEntryRead, 
     VaultEntryDecrypted, 
     VaultRevealRequest,
+    VaultBatchRevealRequest,
+    VaultBatchRevealResponse,
+    VaultAuditRequest,
+    VaultImportResponse,
     PasswordHealthCheck,
     PasswordHealthResponse
 )
-from app.services import vault_service, health_service, pwned_service
+from app.services import vault_service, health_service, pwned_service, audit_service, transfer_service
 
 router = APIRouter()
 
 @router.post("/", response_model=VaultEntryRead)
-def create_entry(
+async def create_entry(
     entry: VaultEntryCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user)
 ):
-    return vault_service.create_vault_entry(db, entry, current_user.id)
+    try:
+        return await vault_service.create_vault_entry(db, entry, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[VaultEntryRead])
-def list_entries(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)
+async def list_entries(
+    response: Response,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    order_by: Literal["id", "updated_at"] = "id",
+    desc: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(deps.get_current_user)
 ):
     """
     List vault entries for current user.
+
+    Cursor mode (default): pass the `X-Next-Cursor` response header back as
+    `after` to get the next page. Every page costs the same regardless of depth.
+    Offset mode: passing `skip` keeps the old skip/limit behaviour.
+    """
+    if skip is not None:
+        return await vault_service.list_vault_entries(db, current_user.id, skip, limit)
+
+    try:
+        rows, next_cursor = await vault_service.list_vault_entries_page(
+            db, current_user.id, limit=limit, after=after, order_by=order_by, descending=desc
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/search", response_model=List[VaultEntryRead])
+async def search_entries(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    """
+    Search the current user's entries by site name or URL (substring, case-insensitive).
+    Site names starting with `q` rank first.
     """
-    return vault_service.list_vault_entries(db, current_user.id, skip, limit)
+    return await vault_service.search_vault_entries(db, current_user.id, q, limit)
+
+@router.post("/import", response_model=VaultImportResponse)
+@cpu_limit(settings.RATE_LIMIT_COST_IMPORT)
+async def import_entries(
+    request: Request,
+    format: Optional[Literal["csv", "json"]] = None,
+    x_master_password: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    """
+    Import entries from a CSV or JSON export sent as the raw request body.
+    The format comes from `format` or the Content-Type. Plaintext passwords are
+    encrypted with the vault key, which needs the `X-Master-Password` header;
+    rows from `GET /vault/export` keep their encrypted_password as-is.
+    Parsing is incremental and rows are inserted in batches; bad rows are
+    reported individually.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        if "csv" in content_type:
+            format = "csv"
+        elif "json" in content_type:
+            format = "json"
+        else:
+            raise HTTPException(status_code=415, detail="Send text/csv or application/json, or pass ?format=")
+
+    parse = transfer_service.iter_csv_records if format == "csv" else transfer_service.iter_json_records
+    try:
+        return await transfer_service.import_entries(db, current_user.id, parse(request.stream()), x_master_password)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export")
+async def export_entries(
+    format: Literal["csv", "json"] = "json",
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    """
+    Export all entries, passwords still encrypted, streamed from the database
+    cursor. The output can be fed back into `POST /vault/import`.
+    """
+    media_type = "text/csv" if format == "csv" else "application/json"
+    return StreamingResponse(
+        transfer_service.export_entries(current_user.id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="securepass-export.{format}"'},
+    )
+
+@router.post("/reveal-batch", response_model=VaultBatchRevealResponse)
+@cpu_limit(settings.RATE_LIMIT_COST_REVEAL_BATCH)
+async def reveal_passwords_batch(
+    request: Request,
+    payload: VaultBatchRevealRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    """
+    Decrypt several entries in one request.
+    Each result reports success or failure on its own, so one bad id does not fail the batch.
+    """
+    results = await vault_service.reveal_vault_entries(db, payload.entry_ids, payload.master_password, current_user.id)
+    return {"results": results}
 
 @router.post("/{entry_id}/reveal", response_model=VaultEntryDecrypted)
-def reveal_password(
+@cpu_limit(settings.RATE_LIMIT_COST_REVEAL)
+async def reveal_password(
+    request: Request,
     entry_id: int, 
-    request: VaultRevealRequest, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)
+    payload: VaultRevealRequest, 
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user)
 ):
     """
     Retrieve and decrypt a specific password.
     Ensures user owns the entry.
     """
-    entry = vault_service.get_vault_entry(db, entry_id, request.master_password, current_user.id)
+    entry = await vault_service.get_vault_entry(db, entry_id, payload.master_password, current_user.id)
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found or decryption failed")
     return entry
 
 @router.post("/check-health", response_model=PasswordHealthResponse)
+@cpu_limit(settings.RATE_LIMIT_COST_CHECK_HEALTH)
 async def check_health(
+    request: Request,
     check: PasswordHealthCheck,
-    current_user: User = Depends(deps.get_current_user) # Optional: Can be public or protected
+    current_user: Principal = Depends(deps.get_current_user) # Optional: Can be public or protected
 ):
     """
     Analyze password strength.
     """
-    strength = health_service.check_password_strength(check.password)
+    strength = await run_in_threadpool(health_service.check_password_strength, check.password)
     pwned_count = await pwned_service.check_pwned_password(check.password)
     
     return {
@@ -70,3 +180,23 @@ async def check_health(
         "is_pwned": pwned_count > 0,
         "pwned_count": pwned_count
     }
+
+@router.post("/audit")
+@cpu_limit(settings.RATE_LIMIT_COST_AUDIT)
+async def audit_vault(
+    request: Request,
+    payload: VaultAuditRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    """
+    Audit every entry in the vault: strength, breach count and password reuse.
+    Streams NDJSON, one line per entry in id order, then a summary line.
+    Entries are decrypted a page at a time while the response streams.
+    """
+    if not await vault_service.check_master_password(db, current_user.id, payload.master_password):
+        raise HTTPException(status_code=400, detail="Decryption failed. Invalid master password.")
+    return StreamingResponse(
+        audit_service.audit_vault(current_user.id, payload.master_password),
+        media_type="application/x-ndjson",
+    )
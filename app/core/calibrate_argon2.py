@@ -0,0 +1,98 @@
+"""
+Picks Argon2id parameters for this host: the highest time cost that keeps one
+hash under a target latency, at the largest memory cost within the budget.
+
+    python -m app.core.calibrate_argon2 --target-ms 250 --memory-mib 64
+    python -m app.core.calibrate_argon2 --env-file .env   # also store the result
+
+Run it on the production hardware with the service idle. The KDF pool runs
+KDF_EXECUTOR_WORKERS hashes at once, so peak hashing memory is roughly
+workers x memory cost; size --memory-mib accordingly.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from argon2.low_level import Type, hash_secret_raw
+
+# Memory floor: the OWASP minimum for Argon2id (19 MiB)
+MIN_MEMORY_KIB = 19 * 1024
+MAX_TIME_COST = 10
+
+def measure_ms(memory_cost_kib: int, time_cost: int, parallelism: int, samples: int = 5) -> float:
+    """Median wall time of one Argon2id hash with these parameters."""
+    timings: List[float] = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hash_secret_raw(
+            b"calibration-password", os.urandom(16),
+            time_cost=time_cost, memory_cost=memory_cost_kib, parallelism=parallelism,
+            hash_len=32, type=Type.ID,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def calibrate(target_ms: float, memory_budget_kib: int, parallelism: int = 1, samples: int = 5) -> Dict[str, float]:
+    """
+    Starts at the full memory budget and raises the time cost while a hash
+    stays within `target_ms`. If even t=1 is too slow, memory is halved
+    (down to MIN_MEMORY_KIB) until it fits.
+    """
+    memory = max(memory_budget_kib, MIN_MEMORY_KIB)
+    while True:
+        elapsed = measure_ms(memory, 1, parallelism, samples)
+        if elapsed <= target_ms or memory == MIN_MEMORY_KIB:
+            break
+        memory = max(memory // 2, MIN_MEMORY_KIB)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        candidate = measure_ms(memory, time_cost + 1, parallelism, samples)
+        if candidate > target_ms:
+            break
+        time_cost += 1
+        elapsed = candidate
+
+    return {
+        "ARGON2_MEMORY_COST_KIB": memory,
+        "ARGON2_TIME_COST": time_cost,
+        "ARGON2_PARALLELISM": parallelism,
+        "measured_ms": round(elapsed, 1),
+    }
+
+def write_env(path: str, values: Dict[str, int]) -> None:
+    """Sets the keys in a dotenv file, keeping every other line."""
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = [line for line in f.read().splitlines() if line.split("=", 1)[0].strip() not in values]
+    lines.extend(f"{key}={value}" for key, value in values.items())
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="latency budget per hash (default 250)")
+    parser.add_argument("--memory-mib", type=int, default=64, help="memory budget per hash (default 64)")
+    parser.add_argument("--parallelism", type=int, default=1, help="Argon2 lanes per hash (default 1)")
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per candidate (default 5)")
+    parser.add_argument("--env-file", help="write the chosen settings to this dotenv file")
+    args = parser.parse_args(argv)
+
+    result = calibrate(args.target_ms, args.memory_mib * 1024, args.parallelism, args.samples)
+    measured = result.pop("measured_ms")
+    for key, value in result.items():
+        print(f"{key}={value}")
+    print(f"# median {measured} ms per hash (target {args.target_ms:g} ms)", file=sys.stderr)
+    if measured > args.target_ms:
+        print("# warning: the OWASP minimum cost already exceeds the target on this host", file=sys.stderr)
+    if args.env_file:
+        write_env(args.env_file, result)
+        print(f"# written to {args.env_file}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,6 +7,149 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str
 
+    # Database. Any async SQLAlchemy URL (sqlite+aiosqlite, postgresql+asyncpg, ...)
+    DATABASE_URL: str = "sqlite+aiosqlite:///./securepass.db"
+    # Optional read-only pool for GET endpoints. For SQLite it opens the same
+    # file with query_only connections; other engines can point at a replica.
+    DB_READ_POOL_ENABLED: bool = False
+    DATABASE_READ_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+
+    # Create missing tables in the lifespan. With several workers or a managed
+    # schema, turn this off and run `python -m app.db.init_db` once per deploy.
+    DB_CREATE_SCHEMA_ON_STARTUP: bool = True
+
+    # SQLite pragmas applied on every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64000  # negative = KiB, i.e. ~64 MB
+
+    # Unlocked vault data keys are cached in memory, keyed by an HMAC of the
+    # master password, so repeated reveals skip the PBKDF2 run.
+    VAULT_KEY_CACHE_SIZE: int = 1024
+    VAULT_KEY_CACHE_TTL_SECONDS: int = 300
+    # Legacy entries re-encrypted per query when a vault gets its data key
+    VAULT_UPGRADE_BATCH_SIZE: int = 256
+
+    # Verified bearer token -> principal, so repeat requests skip the JWT check
+    # and the users query. Entries never outlive the token's exp. Invalidation
+    # is per process, so the TTL bounds staleness across workers.
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Argon2id cost for account passwords. Pick values for this host with
+    # `python -m app.core.calibrate_argon2`; hashes made with other parameters
+    # are upgraded on the user's next successful login.
+    ARGON2_MEMORY_COST_KIB: int = 65536
+    ARGON2_TIME_COST: int = 3
+    ARGON2_PARALLELISM: int = 4
+    # Argon2 memory allowed in flight at once (all hashing threads together).
+    # Hashes that do not fit wait up to the timeout, then get 503. Unset, it
+    # fits KDF_EXECUTOR_WORKERS // 2 hashes at ARGON2_MEMORY_COST_KIB.
+    ARGON2_MEMORY_BUDGET_MIB: Optional[int] = None
+    ARGON2_ADMISSION_TIMEOUT_SECONDS: float = 2.0
+
+    # Dedicated pool for Argon2 / PBKDF2 work. Requests beyond
+    # workers + queue size are rejected with 503 instead of queuing.
+    KDF_EXECUTOR_WORKERS: int = os.cpu_count() or 2
+    KDF_EXECUTOR_QUEUE_SIZE: int = 16
+    KDF_EXECUTOR_RETRY_AFTER_SECONDS: int = 1
+
+    # Rate limiting. The SQLite storage is shared by every worker on the host;
+    # "memory://" gives each process its own counters.
+    RATE_LIMIT_STORAGE_URI: str = "sqlite:///./ratelimit.db"
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter"
+    # Per-client budget of CPU units shared by the expensive routes below,
+    # each charged its cost (roughly: 1 unit = one zxcvbn run, 10 = one Argon2 hash)
+    RATE_LIMIT_CPU_BUDGET: str = "120/minute"
+    RATE_LIMIT_COST_LOGIN: int = 10
+    RATE_LIMIT_COST_REGISTER: int = 10
+    RATE_LIMIT_COST_REVEAL: int = 2
+    RATE_LIMIT_COST_REVEAL_BATCH: int = 5
+    RATE_LIMIT_COST_CHECK_HEALTH: int = 1
+    RATE_LIMIT_COST_AUDIT: int = 30
+    RATE_LIMIT_COST_IMPORT: int = 30
+    # Anonymous file shares: uploads per client, and MiB uploaded per client
+    # (uploads without a Content-Length are charged SHARE_FILE_MAX_BYTES)
+    RATE_LIMIT_SHARE_FILE: str = "10/hour"
+    RATE_LIMIT_SHARE_FILE_MIB: str = "500/hour"
+
+    # Breach lookups: "api" (Have I Been Pwned range API) or "offline"
+    # (local corpus built with `python -m app.services.pwned_corpus build`)
+    PWNED_BACKEND: str = "api"
+    PWNED_CORPUS_PATH: Optional[str] = None
+    PWNED_BLOOM_PATH: Optional[str] = None
+
+    PWNED_API_URL: str = "https://api.pwnedpasswords.com"
+    PWNED_TIMEOUT_SECONDS: float = 5.0
+    PWNED_MAX_CONNECTIONS: int = 20
+    PWNED_CACHE_SIZE: int = 1024
+    PWNED_CACHE_TTL_SECONDS: int = 3600
+
+    # Password strength estimation. zxcvbn sees at most this many characters;
+    # the rest only earns credit for what it adds to the compressed size.
+    STRENGTH_MAX_LENGTH: int = 100
+    STRENGTH_CACHE_SIZE: int = 4096
+    STRENGTH_CACHE_TTL_SECONDS: int = 3600
+    # zxcvbn is loaded on first use; set to load it in the background at startup
+    STRENGTH_PREWARM_ON_STARTUP: bool = False
+
+    # Background reaper for expired share links. Runs every interval plus up to
+    # `jitter` seconds, deleting at most `batch size` rows per transaction.
+    SHARE_REAPER_ENABLED: bool = True
+    SHARE_REAPER_INTERVAL_SECONDS: float = 300
+    SHARE_REAPER_JITTER_SECONDS: float = 30
+    SHARE_REAPER_BATCH_SIZE: int = 500
+
+    # Vault import/export. Imports are encrypted and inserted this many rows per
+    # transaction; exports are read from the cursor this many rows at a time.
+    VAULT_IMPORT_BATCH_SIZE: int = 1000
+    VAULT_IMPORT_MAX_RECORD_BYTES: int = 64 * 1024
+    VAULT_IMPORT_MAX_ERRORS: int = 1000
+    VAULT_EXPORT_BATCH_SIZE: int = 500
+
+    # File shares: ciphertext is stored on disk, encrypted in chunks of this size
+    SHARE_FILE_DIR: str = "./share_files"
+    SHARE_FILE_CHUNK_SIZE: int = 64 * 1024
+    SHARE_FILE_MAX_BYTES: int = 100 * 1024 * 1024
+    # Longest lifetime a text or file share can be created with
+    SHARE_MAX_TTL_MINUTES: int = 7 * 24 * 60
+
+    # Response compression for text bodies of at least this many bytes: brotli
+    # when the optional `brotli` package is installed and accepted, else gzip.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Prometheus metrics at GET /metrics. With several worker processes, point
+    # METRICS_MULTIPROC_DIR at a shared directory; each worker writes a snapshot
+    # there every flush interval and /metrics reports the sum over all of them.
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5
+
+    # Opt-in request profiling: requests sending `X-Profile: <PROFILING_TOKEN>`
+    # get a Server-Timing header. With a cProfile directory set, adding
+    # `X-Profile-Capture: 1` also saves a cProfile dump there (rate limited,
+    # only the newest PROFILING_CPROFILE_KEEP files are kept).
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_CPROFILE_DIR: Optional[str] = None
+    PROFILING_CPROFILE_MAX_PER_MINUTE: int = 6
+    PROFILING_CPROFILE_KEEP: int = 50
+
+    # Whole-vault audit (POST /vault/audit)
+    AUDIT_STRENGTH_WORKERS: int = os.cpu_count() or 2
+    AUDIT_BREACH_CONCURRENCY: int = 16
+    AUDIT_CHUNK_SIZE: int = 32
+    # Entries decrypted per page; bounds the plaintext held in memory at once
+    AUDIT_BATCH_SIZE: int = 256
+
     class Config:
         env_file = ".env"
 
@@ -1,8 +1,10 @@
 import os
 import base64
+from typing import Optional, Tuple
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from app.core import metrics
 
 # Constants
 SALT_SIZE = 16
@@ -10,6 +12,10 @@ NONCE_SIZE = 12
 KEY_SIZE = 32  # 32 bytes for AES-256
 ITERATIONS = 100000 # Enough for demonstration, cleaner would be higher but slower
 
+# Blob versions. Legacy blobs carry no version byte and start with a random salt.
+LEGACY_VERSION = 0
+ENVELOPE_VERSION = 1
+
 def derive_key(master_password: str, salt: bytes) -> bytes:
     """
     Derives a 256-bit key from the master password using PBKDF2-HMAC-SHA256.
@@ -22,7 +28,8 @@ def derive_key(master_password: str, salt: bytes) -> bytes:
         salt=salt,
         iterations=ITERATIONS,
     )
-    return kdf.derive(master_password.encode('utf-8'))
+    with metrics.kdf_latency.time(op="pbkdf2"):
+        return kdf.derive(master_password.encode('utf-8'))
 
 def encrypt_password(master_password: str, plaintext: str) -> str:
     """
@@ -63,3 +70,113 @@ def decrypt_password(master_password: str, encrypted_data: str) -> str:
         # generic failure is often better to avoid oracle attacks, 
         # though explicit error helps debugging.
         raise ValueError("Decryption failed. Invalid password or corrupted data.") from e
+
+
+# --- Envelope encryption ---
+# The master password derives a key-encryption key (KEK) once, the KEK unwraps a
+# random per-user data key, and vault entries are encrypted with the data key
+# using AES-GCM only. No PBKDF2 run is needed per entry.
+
+def generate_data_key() -> bytes:
+    return AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+
+def wrap_data_key(master_password: str, data_key: bytes) -> str:
+    """
+    Wraps the per-user data key with a KEK derived from the master password.
+
+    Format: [Version (1)][Salt (16)][Nonce (12)][Wrapped key (32 + tag 16)]
+    """
+    header = bytes([ENVELOPE_VERSION])
+    salt = os.urandom(SALT_SIZE)
+    kek = derive_key(master_password, salt)
+    nonce = os.urandom(NONCE_SIZE)
+
+    wrapped = AESGCM(kek).encrypt(nonce, data_key, header + salt)
+    return base64.urlsafe_b64encode(header + salt + nonce + wrapped).decode('utf-8')
+
+def unwrap_data_key(master_password: str, wrapped_key: str) -> bytes:
+    try:
+        data = base64.urlsafe_b64decode(wrapped_key)
+        if data[0] != ENVELOPE_VERSION:
+            raise ValueError(f"Unsupported key version {data[0]}")
+
+        header = data[:1]
+        salt = data[1:1+SALT_SIZE]
+        nonce = data[1+SALT_SIZE:1+SALT_SIZE+NONCE_SIZE]
+        wrapped = data[1+SALT_SIZE+NONCE_SIZE:]
+
+        kek = derive_key(master_password, salt)
+        return AESGCM(kek).decrypt(nonce, wrapped, header + salt)
+    except Exception as e:
+        raise ValueError("Unable to unlock vault key. Invalid password or corrupted data.") from e
+
+def encrypt_with_data_key(data_key: bytes, plaintext: str) -> str:
+    """
+    Encrypts plaintext with an already unwrapped data key.
+
+    Format: [Version (1)][Nonce (12)][Ciphertext (variable + tag 16)]
+    """
+    header = bytes([ENVELOPE_VERSION])
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = AESGCM(data_key).encrypt(nonce, plaintext.encode('utf-8'), header)
+    return base64.urlsafe_b64encode(header + nonce + ciphertext).decode('utf-8')
+
+def decrypt_with_data_key(data_key: bytes, encrypted_data: str) -> str:
+    try:
+        data = base64.urlsafe_b64decode(encrypted_data)
+        if data[0] != ENVELOPE_VERSION:
+            raise ValueError(f"Unsupported blob version {data[0]}")
+
+        header = data[:1]
+        nonce = data[1:1+NONCE_SIZE]
+        ciphertext = data[1+NONCE_SIZE:]
+
+        plaintext = AESGCM(data_key).decrypt(nonce, ciphertext, header)
+        return plaintext.decode('utf-8')
+    except Exception as e:
+        raise ValueError("Decryption failed. Invalid key or corrupted data.") from e
+
+def is_encrypted_blob(encrypted_data: str) -> bool:
+    """
+    Structural check for a stored vault blob: strict URL-safe base64 of an
+    envelope blob ([version][nonce][ciphertext + tag]). Legacy blobs carry no
+    marker, so any long enough base64 would pass for one; they are not
+    accepted. Does not authenticate the blob.
+    """
+    try:
+        data = base64.b64decode(encrypted_data, altchars=b"-_", validate=True)
+    except (ValueError, TypeError):
+        return False
+    return data[:1] == bytes([ENVELOPE_VERSION]) and len(data) >= 1 + NONCE_SIZE + 16
+
+def has_envelope_marker(encrypted_data: str) -> bool:
+    """True if the blob starts with the envelope version byte."""
+    try:
+        return base64.urlsafe_b64decode(encrypted_data)[:1] == bytes([ENVELOPE_VERSION])
+    except Exception:
+        return False
+
+def decrypt_entry(
+    encrypted_data: str,
+    data_key: Optional[bytes] = None,
+    master_password: Optional[str] = None,
+) -> Tuple[str, int]:
+    """
+    Decrypts a vault blob of either version.
+    Returns (plaintext, version) so callers can re-encrypt legacy blobs.
+
+    Blobs without the version marker go straight to the legacy (PBKDF2) path.
+    A legacy blob starts with a random salt, so its first byte equals the marker
+    1 time in 256; such a blob fails AES-GCM authentication under the data key
+    and only then falls back to the legacy format. Callers reject a wrong master
+    password when unwrapping the data key, before any entry reaches this.
+    """
+    if has_envelope_marker(encrypted_data) and data_key is not None:
+        try:
+            return decrypt_with_data_key(data_key, encrypted_data), ENVELOPE_VERSION
+        except ValueError:
+            pass
+
+    if master_password is None:
+        raise ValueError("Decryption failed. Invalid key or corrupted data.")
+    return decrypt_password(master_password, encrypted_data), LEGACY_VERSION
@@ -0,0 +1,247 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, List
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+class ServiceOverloaded(Exception):
+    """Raised when expensive work is shed instead of queued. Served as 503 + Retry-After."""
+
+    def __init__(self, detail: str = "Server is busy, please retry shortly.", retry_after: int = 1):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionRejected(ServiceOverloaded):
+    """Raised when a memory budget stayed full past the admission deadline."""
+
+async def service_overloaded_handler(request: Request, exc: ServiceOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+class CPUExecutor:
+    """
+    Thread pool reserved for CPU-heavy work (Argon2, PBKDF2) with a bounded queue.
+
+    Keeping this work off Starlette's shared threadpool means a login burst can
+    only saturate this pool, never the threads serving cheap requests. When
+    `max_workers + max_queue` tasks are already pending, `submit` fails fast with
+    ServiceOverloaded instead of growing the queue. Argon2 (argon2-cffi) and
+    PBKDF2 (OpenSSL) run in native code, so threads are enough here.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent_waits = deque(maxlen=1024)
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceOverloaded(retry_after=self.retry_after)
+
+        enqueued = time.perf_counter()
+        # Carry the caller's context vars (request-scoped state) into the worker
+        ctx = contextvars.copy_context()
+
+        def _run():
+            waited = time.perf_counter() - enqueued
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._recent_waits.append(waited)
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                self._slots.release()
+
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._pool.submit(_run)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Blocking call for sync code. Never call this from inside the pool itself."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _submit_chunks(self, fn: Callable, items: List[Any]) -> List[Future]:
+        size = max(1, -(-len(items) // self.max_workers))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        return [self.submit(lambda chunk: [fn(item) for item in chunk], chunk) for chunk in chunks]
+
+    def map(self, fn: Callable, items: Iterable) -> List[Any]:
+        """
+        Applies `fn` to every item, split into at most `max_workers` tasks so a
+        large batch takes a few queue slots instead of one per item.
+        """
+        futures = self._submit_chunks(fn, list(items))
+        return [result for future in futures for result in future.result()]
+
+    async def map_async(self, fn: Callable, items: Iterable) -> List[Any]:
+        """Async counterpart of `map` for callers on the event loop."""
+        futures = self._submit_chunks(fn, list(items))
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return [result for chunk_results in results for result in chunk_results]
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            started = self._completed + self._running
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_avg_ms": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                "wait_p99_ms": round(waits[int(len(waits) * 0.99)] * 1000, 3) if waits else 0.0,
+            }
+
+class MemoryBudget:
+    """
+    Admission control by memory, on the event loop: work declares the bytes it
+    will allocate and waits until they fit in the budget *before* it is
+    submitted to a pool, so waiting never holds a pool thread. Waiters are
+    admitted in arrival order. Waiting is bounded by `timeout`, after which the
+    work is shed with AdmissionRejected (503). A single item larger than the
+    whole budget is admitted once nothing else is in flight.
+    """
+
+    def __init__(self, name: str, budget_bytes: int, timeout: float, retry_after: int = 1):
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._waiters: deque = deque()  # (cost, future), oldest first
+        self._in_use = 0
+        self._in_flight = 0
+        self._admitted = 0
+        self._shed = 0
+        self._wait_max = 0.0
+
+    def _take(self, cost: int) -> None:
+        self._in_use += cost
+        self._in_flight += 1
+        self._admitted += 1
+
+    def _release(self, cost: int) -> None:
+        self._in_use -= cost
+        self._in_flight -= 1
+        self._grant()
+
+    def _grant(self) -> None:
+        """Admits waiters from the head of the queue while they fit."""
+        while self._waiters:
+            cost, waiter = self._waiters[0]
+            if not waiter.done() and self._in_use + cost > self.budget_bytes:
+                return
+            self._waiters.popleft()
+            if not waiter.done():
+                self._take(cost)
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, cost_bytes: int) -> AsyncIterator[None]:
+        cost = min(cost_bytes, self.budget_bytes)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if not self._waiters and self._in_use + cost <= self.budget_bytes:
+            self._take(cost)
+        else:
+            entry = (cost, loop.create_future())
+            self._waiters.append(entry)
+            try:
+                await asyncio.wait_for(entry[1], self.timeout)
+            except BaseException as e:
+                if entry[1].done() and not entry[1].cancelled():
+                    # Admitted just as the wait ended
+                    self._release(cost)
+                elif entry in self._waiters:
+                    self._waiters.remove(entry)
+                    # Smaller work queued behind this one may fit now
+                    self._grant()
+                if isinstance(e, asyncio.TimeoutError):
+                    self._shed += 1
+                    raise AdmissionRejected(retry_after=self.retry_after) from None
+                raise
+        self._wait_max = max(self._wait_max, loop.time() - started)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "budget_bytes": self.budget_bytes,
+            "in_use_bytes": self._in_use,
+            "admitted": self._in_flight,
+            "queued": len(self._waiters),
+            "admitted_total": self._admitted,
+            "shed_total": self._shed,
+            "wait_max_ms": round(self._wait_max * 1000, 3),
+        }
+
+# Shared pool for password hashing and key derivation
+kdf_executor = CPUExecutor(
+    "kdf",
+    max_workers=settings.KDF_EXECUTOR_WORKERS,
+    max_queue=settings.KDF_EXECUTOR_QUEUE_SIZE,
+    retry_after=settings.KDF_EXECUTOR_RETRY_AFTER_SECONDS,
+)
+
+def _default_hash_memory_budget_bytes() -> int:
+    """Room for half the KDF workers to run Argon2 at once; the rest stay free for PBKDF2."""
+    return max(1, settings.KDF_EXECUTOR_WORKERS // 2) * settings.ARGON2_MEMORY_COST_KIB * 1024
+
+# Bounds the Argon2 memory allocated at once across all hashing threads
+hash_memory_budget = MemoryBudget(
+    "argon2",
+    budget_bytes=(
+        settings.ARGON2_MEMORY_BUDGET_MIB * 1024 * 1024
+        if settings.ARGON2_MEMORY_BUDGET_MIB is not None
+        else _default_hash_memory_budget_bytes()
+    ),
+    timeout=settings.ARGON2_ADMISSION_TIMEOUT_SECONDS,
+    retry_after=settings.KDF_EXECUTOR_RETRY_AFTER_SECONDS,
+)
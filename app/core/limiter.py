@@ -2,4 +2,24 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.core.config import settings
+# Registers the sqlite:// storage scheme with `limits`
+from app.core import rate_limit_storage  # noqa: F401
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    # Keep limiting per process if the shared storage becomes unavailable
+    in_memory_fallback_enabled=True,
+)
+
+def cpu_limit(cost: int):
+    """Charges `cost` units against the per-client CPU budget shared by all expensive routes."""
+    return limiter.shared_limit(settings.RATE_LIMIT_CPU_BUDGET, scope="cpu", cost=cost)
+
+def upload_mib(request) -> int:
+    """Cost of a file upload: its declared size in MiB (at least 1). Without a Content-Length, the maximum size."""
+    length = request.headers.get("content-length", "")
+    size = int(length) if length.isdigit() else settings.SHARE_FILE_MAX_BYTES
+    return max(1, -(-size // (1024 * 1024)))
@@ -0,0 +1,264 @@
+"""
+In-process metrics: counters and fixed-bucket histograms rendered in the
+Prometheus text format at GET /metrics.
+
+With several workers, set METRICS_MULTIPROC_DIR to a directory shared by them:
+each process writes a snapshot there every METRICS_FLUSH_INTERVAL_SECONDS and
+/metrics sums the snapshots of all processes, whichever worker serves it.
+"""
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.core import profiling
+from app.core.config import settings
+
+# Latency buckets in seconds, from sub-millisecond lookups to multi-second KDF queues
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, span: str = ""):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Server-Timing span that observations also count towards on profiled requests
+        self.span = span
+        # Per label set: [count per bucket..., count above the last bucket, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        if self.span:
+            profiling.record(self.span, value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            return {key: list(counts) for key, counts in self._values.items()}
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        return {
+            name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def _merged(self) -> dict:
+        """This process's values plus the latest snapshots of the other processes."""
+        merged = {name: {tuple(key): value for key, value in values} for name, values in self.snapshot().items()}
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory or not os.path.isdir(directory):
+            return merged
+        own = _snapshot_path(os.getpid())
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".json") or entry.path == own:
+                continue
+            try:
+                with open(entry.path) as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in other.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in values:
+                    key = tuple(key)
+                    if isinstance(metric, Histogram):
+                        if len(value) != len(metric.buckets) + 2:
+                            continue  # written with different buckets
+                        current = target.get(key)
+                        target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0.0) + value
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        merged = self._merged()
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value[-1]}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(settings.METRICS_MULTIPROC_DIR, f"metrics-{pid}.json")
+
+def write_snapshot() -> None:
+    """Publishes this process's values to METRICS_MULTIPROC_DIR (no-op when unset)."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(path + ".tmp", "w") as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+async def run_flusher() -> None:
+    """Lifespan task for multiprocess mode."""
+    try:
+        while True:
+            await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+            await asyncio.to_thread(write_snapshot)
+    finally:
+        write_snapshot()
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.register(Counter(
+    "securepass_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+http_latency = REGISTRY.register(Histogram(
+    "securepass_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")))
+kdf_latency = REGISTRY.register(Histogram(
+    "securepass_kdf_duration_seconds", "Key derivation and password hashing time.", ("op",), span="crypto"))
+strength_latency = REGISTRY.register(Histogram(
+    "securepass_zxcvbn_duration_seconds", "zxcvbn strength estimation time (cache misses).", span="strength"))
+pwned_latency = REGISTRY.register(Histogram(
+    "securepass_pwned_check_duration_seconds", "Breached-password lookup time.", ("backend",), span="hibp"))
+db_queries = REGISTRY.register(Counter(
+    "securepass_db_queries_total", "SQL statements executed.", ("engine",)))
+db_latency = REGISTRY.register(Histogram(
+    "securepass_db_query_duration_seconds", "SQL statement execution time.", ("engine",), span="db"))
+rate_limited = REGISTRY.register(Counter(
+    "securepass_rate_limit_rejections_total", "Requests rejected by the rate limiter.", ("route",)))
+
+def instrument_engine(sync_engine, name: str) -> None:
+    """
+    Counts and times every statement on an engine (pass `async_engine.sync_engine`
+    for async ones). The start time lives on the statement's execution context,
+    so a statement that fails (no after_cursor_execute) leaves nothing behind;
+    handle_error records it too.
+    """
+    def _observe(context) -> None:
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        context._metrics_started = None
+        db_queries.inc(engine=name)
+        db_latency.observe(time.perf_counter() - started, engine=name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _observe(context)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        _observe(exception_context.execution_context)
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and status per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            method = scope["method"]
+            http_latency.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status))
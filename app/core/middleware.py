@@ -0,0 +1,177 @@
+"""
+Pure ASGI middleware for security headers and response compression. Both
+only touch the ASGI messages, so they add no task or stream per request the
+way @app.middleware("http") (BaseHTTPMiddleware) does.
+"""
+import zlib
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in (
+        ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+        ("X-Frame-Options", "DENY"),
+        ("X-XSS-Protection", "1; mode=block"),
+        (
+            "Content-Security-Policy",
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data:;",
+        ),
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    )
+]
+
+class SecurityHeadersMiddleware:
+    """Appends the precomputed SECURITY_HEADERS to every HTTP response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), *SECURITY_HEADERS]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+# Only text formats; encrypted file shares (octet-stream) do not compress
+COMPRESSIBLE_TYPES = {
+    b"application/json",
+    b"application/x-ndjson",
+    b"text/csv",
+    b"text/plain",
+    b"text/html",
+}
+
+# Bodies at least this large are compressed off the event loop
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+def _accepted_encoding(headers) -> Optional[bytes]:
+    accepted = set()
+    for name, value in headers:
+        if name != b"accept-encoding":
+            continue
+        for item in value.split(b","):
+            coding, *params = item.split(b";")
+            quality = 1.0
+            for param in params:
+                key, _, number = param.strip().partition(b"=")
+                if key == b"q":
+                    try:
+                        quality = float(number)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                accepted.add(coding.strip().lower())
+    if brotli is not None and b"br" in accepted:
+        return b"br"
+    if b"gzip" in accepted:
+        return b"gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: bytes):
+        if encoding == b"br":
+            self._br = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Streaming chunks are flushed so NDJSON lines still reach the client as they are produced
+        if self._br is not None:
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """
+    Streams gzip (or brotli, when installed and accepted) encoded response
+    bodies for text content types. Responses smaller than
+    COMPRESSION_MINIMUM_SIZE, already encoded or partial are passed through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        encoding = _accepted_encoding(scope["headers"]) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                headers = message.get("headers", ())
+                content_type = b""
+                for name, value in headers:
+                    if name == b"content-encoding":
+                        passthrough = True
+                    elif name == b"content-type":
+                        content_type = value.partition(b";")[0].strip().lower()
+                if passthrough or message["status"] in (204, 206, 304) or content_type not in COMPRESSIBLE_TYPES:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held until the first body chunk decides
+                return
+            if passthrough or message_type != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                response_start, start = start, None
+                headers = [*response_start["headers"], (b"vary", b"Accept-Encoding")]
+                if not more_body and len(body) < settings.COMPRESSION_MINIMUM_SIZE:
+                    passthrough = True
+                    await send({**response_start, "headers": headers})
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = [(name, value) for name, value in headers if name != b"content-length"]
+                headers.append((b"content-encoding", encoding))
+                if not more_body:
+                    data = await self._compress(compressor, body, True)
+                    headers.append((b"content-length", str(len(data)).encode()))
+                    await send({**response_start, "headers": headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**response_start, "headers": headers})
+
+            data = await self._compress(compressor, body, not more_body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    async def _compress(compressor: _Compressor, data: bytes, final: bool) -> bytes:
+        if len(data) >= THREAD_MINIMUM_SIZE:
+            return await run_in_threadpool(compressor.compress, data, final)
+        return compressor.compress(data, final)
@@ -0,0 +1,165 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED and a request carrying `X-Profile: <PROFILING_TOKEN>`,
+the response gets a Server-Timing header with the time spent in the auth
+dependency, SQL, key derivation/hashing, zxcvbn and breach lookups, plus the
+whole request as `total`. Spans may overlap (auth includes its own DB query).
+
+Adding `X-Profile-Capture: 1` also runs cProfile for the request and writes
+the stats to PROFILING_CPROFILE_DIR, at most one capture at a time and
+PROFILING_CPROFILE_MAX_PER_MINUTE per process. cProfile only sees the event
+loop thread, and any other request interleaved on it while the capture runs.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+CAPTURE_HEADER = b"x-profile-capture"
+
+class _Spans:
+    """Span name -> [seconds, count] for one request, shared with worker threads."""
+
+    def __init__(self):
+        self.values: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.values.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self, total: float) -> str:
+        with self._lock:
+            parts = [
+                f'{name};dur={seconds * 1000:.2f};desc="{count}x"'
+                for name, (seconds, count) in self.values.items()
+            ]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+# Set only for profiled requests; everything else pays one ContextVar lookup
+_current: contextvars.ContextVar[Optional[_Spans]] = contextvars.ContextVar("profiling_spans", default=None)
+
+def record(name: str, seconds: float) -> None:
+    spans = _current.get()
+    if spans is not None:
+        spans.add(name, seconds)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+def timed(name: str):
+    """Decorator form of `span` for async functions (e.g. FastAPI dependencies)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _authorized(headers: List) -> Optional[bool]:
+    """None if the request did not ask to be profiled, else whether to run cProfile."""
+    token = capture = None
+    for name, value in headers:
+        if name == PROFILE_HEADER:
+            token = value
+        elif name == CAPTURE_HEADER:
+            capture = value
+    expected = settings.PROFILING_TOKEN
+    if token is None or not expected or not hmac.compare_digest(token, expected.encode()):
+        return None
+    return capture in (b"1", b"true")
+
+_capture_lock = threading.Lock()
+_recent_captures: deque = deque()
+
+def _acquire_capture() -> bool:
+    if not settings.PROFILING_CPROFILE_DIR or not _capture_lock.acquire(blocking=False):
+        return False
+    now = time.monotonic()
+    while _recent_captures and now - _recent_captures[0] > 60:
+        _recent_captures.popleft()
+    if len(_recent_captures) >= settings.PROFILING_CPROFILE_MAX_PER_MINUTE:
+        _capture_lock.release()
+        return False
+    _recent_captures.append(now)
+    return True
+
+def _write_capture(profiler: cProfile.Profile, scope) -> None:
+    """Dumps the stats and deletes all but the newest PROFILING_CPROFILE_KEEP files."""
+    directory = settings.PROFILING_CPROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    route = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")[:80] or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{scope['method']}-{route}.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+
+    captures = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in captures[:-settings.PROFILING_CPROFILE_KEEP]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware adding Server-Timing (and optional cProfile) to authorized requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        capture = _authorized(scope.get("headers", [])) if scope["type"] == "http" else None
+        if capture is None:
+            await self.app(scope, receive, send)
+            return
+
+        spans = _Spans()
+        token = _current.set(spans)
+        profiler = cProfile.Profile() if capture and _acquire_capture() else None
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", spans.server_timing(time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                try:
+                    await run_in_threadpool(_write_capture, profiler, scope)
+                finally:
+                    _capture_lock.release()
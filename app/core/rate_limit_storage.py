@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+from typing import Optional, Tuple
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    `limits` storage backed by a local SQLite file in WAL mode, so every worker
+    process on the host shares one set of counters: `sqlite:///./ratelimit.db`.
+
+    Sliding-window acquisition reads both windows and increments inside one
+    BEGIN IMMEDIATE transaction, so concurrent workers cannot overshoot a limit.
+
+    Limits are checked on the event loop, so the write lock is waited for at
+    most `busy_timeout_ms`. If another process holds it longer, the hit is
+    admitted uncounted (fail open) and counted in `lock_timeouts` instead of
+    stalling every request on this worker.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired counters are purged every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, busy_timeout_ms: int = 100, **options):
+        path = uri.split("://", 1)[1]
+        # sqlite:///./file.db -> ./file.db, sqlite:////abs/file.db -> /abs/file.db
+        self.path = path[1:] if path.startswith("/") else path
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self._local = threading.local()
+        self._writes = 0
+        self.lock_timeouts = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: connections don't survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+                "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _get(self, conn: sqlite3.Connection, key: str, now: float) -> Tuple[int, float]:
+        row = conn.execute(
+            "SELECT count, expires_at FROM rate_limit_counters WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, now)
+
+    def _incr(self, conn: sqlite3.Connection, key: str, expiry: float, amount: int, now: float) -> int:
+        # An expired counter restarts at `amount` with a fresh expiry
+        row = conn.execute(
+            "INSERT INTO rate_limit_counters (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "count = CASE WHEN expires_at > ? THEN count + excluded.count ELSE excluded.count END, "
+            "expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END "
+            "RETURNING count",
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limit_counters WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    @staticmethod
+    def _is_locked(error: sqlite3.OperationalError) -> bool:
+        return "locked" in str(error) or "busy" in str(error)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        conn = self._connection()
+        try:
+            with conn:
+                return self._incr(conn, key, expiry, amount, time.time())
+        except sqlite3.OperationalError as e:
+            if not self._is_locked(e):
+                raise
+            self.lock_timeouts += 1
+            return amount
+
+    def get(self, key: str) -> int:
+        return self._get(self._connection(), key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        return self._get(self._connection(), key, time.time())[1]
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM rate_limit_counters").rowcount
+
+    def clear(self, key: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM rate_limit_counters WHERE key = ?", (key,))
+
+    def _sliding_window(self, conn: sqlite3.Connection, key: str, expiry: int, now: float) -> Tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)[0]
+        current_count = self._get(conn, current_key, now)[0]
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        conn = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front: read, decide and increment atomically
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not self._is_locked(e):
+                raise
+            self.lock_timeouts += 1
+            return True
+        try:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(conn, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            # The current window is read as the previous one for a full expiry after it ends
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        return self._sliding_window(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
@@ -1,20 +1,64 @@
+import re
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt
 from passlib.context import CryptContext
+from app.core import metrics
 from app.core.config import settings
+from app.core.executor import hash_memory_budget, kdf_executor
+
+def build_pwd_context(memory_cost_kib: int, time_cost: int, parallelism: int) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__memory_cost=memory_cost_kib,
+        argon2__rounds=time_cost,
+        argon2__parallelism=parallelism,
+    )
 
 # Setup password hashing (Argon2 is more robust and has no length limit)
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = build_pwd_context(settings.ARGON2_MEMORY_COST_KIB, settings.ARGON2_TIME_COST, settings.ARGON2_PARALLELISM)
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+_MEMORY_COST = re.compile(r"\$m=(\d+)")
+
+def _hash_memory_bytes(hashed_password: Optional[str] = None) -> int:
+    """Memory an Argon2 run allocates: the stored hash's m= cost, or the configured one."""
+    match = _MEMORY_COST.search(hashed_password) if hashed_password else None
+    kib = int(match.group(1)) if match else pwd_context.handler().memory_cost
+    return kib * 1024
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with metrics.kdf_latency.time(op="argon2_verify"):
+        return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Like verify_password, but also returns a new hash when the stored one was
+    made with other Argon2 parameters than the configured ones (else None).
+    """
+    with metrics.kdf_latency.time(op="argon2_verify"):
+        return pwd_context.verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with metrics.kdf_latency.time(op="argon2_hash"):
+        return pwd_context.hash(password)
+
+# Request paths: admitted against the Argon2 memory budget on the event loop,
+# then run on the KDF pool, so a hash waiting for memory never holds a thread.
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # A rehash runs after the verify in the same slot, so reserve the larger of the two
+    cost = max(_hash_memory_bytes(hashed_password), _hash_memory_bytes())
+    async with hash_memory_budget.admit(cost):
+        return await kdf_executor.run_async(verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    async with hash_memory_budget.admit(_hash_memory_bytes()):
+        return await kdf_executor.run_async(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
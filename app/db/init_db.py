@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from app.db import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.db.session import Base, async_engine
+
+def upgrade_schema(connection) -> None:
+    """
+    create_all only creates missing tables, so columns and indexes added to
+    existing models since a database was created are added here. Additive
+    and idempotent: safe to run on every start.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    backfill_updated_at(connection)
+
+def backfill_updated_at(connection) -> None:
+    """
+    Entries written before updated_at had a default have it NULL, which
+    keyset paging on (updated_at, id) cannot seek past. They take their
+    created_at. SQLite compares DATETIME values as text, so the value is
+    written in the microsecond format SQLAlchemy uses for new rows.
+    """
+    if connection.dialect.name == "sqlite":
+        value = "strftime('%Y-%m-%d %H:%M:%f', COALESCE(created_at, CURRENT_TIMESTAMP)) || '000'"
+    else:
+        value = "COALESCE(created_at, CURRENT_TIMESTAMP)"
+    connection.execute(text(f"UPDATE vault_entries SET updated_at = {value} WHERE updated_at IS NULL"))
+
+async def create_schema() -> None:
+    """
+    Creates missing tables, columns, indexes and the search index. Run by the lifespan when
+    DB_CREATE_SCHEMA_ON_STARTUP is set, otherwise as a deploy step:
+
+        python -m app.db.init_db
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+if __name__ == "__main__":
+    asyncio.run(create_schema())
+    print("Schema is up to date.")
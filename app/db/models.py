@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
+from datetime import datetime
 from app.db.session import Base
+from app.db.search import drop_search_index, install_search_index
 
 def generate_uuid():
     return str(uuid.uuid4())
@@ -16,6 +18,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     totp_secret = Column(String, nullable=True)
+
+    # Per-user data key, wrapped by a key derived from the master password
+    vault_key_wrapped = Column(String, nullable=True)
     
     vault_entries = relationship("VaultEntry", back_populates="user")
 
@@ -32,13 +37,30 @@ class VaultEntry(Base):
     user = relationship("User", back_populates="vault_entries")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set in Python so stored values and keyset cursor bounds share one format
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Keyset pagination: per-user listing ordered by id or by updated_at
+    __table_args__ = (
+        Index("ix_vault_entries_user_id_id", "user_id", "id"),
+        Index("ix_vault_entries_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
+    # Load server-generated timestamps on flush; async sessions cannot lazy-load them later
+    __mapper_args__ = {"eager_defaults": True}
+
+# FTS5 index over site_name/site_url, maintained by triggers (see app/db/search.py)
+event.listen(Base.metadata, "after_create", install_search_index)
+event.listen(Base.metadata, "before_drop", drop_search_index)
 
 class SharedSecret(Base):
     __tablename__ = "shared_secrets"
 
     id = Column(String, primary_key=True, default=generate_uuid)
     encrypted_content = Column(String, nullable=False)
+    # Set for file shares: plaintext size. The ciphertext lives in SHARE_FILE_DIR/<id>.bin
+    # and encrypted_content holds the encrypted file name.
+    file_size = Column(Integer, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Indexed for the expiry reaper (share_service.reap_expired_secrets)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
@@ -0,0 +1,80 @@
+"""
+Full-text index over vault_entries.site_name / site_url (SQLite FTS5, trigram tokenizer).
+
+The index is an FTS5 table kept in sync by triggers, so create, update and
+delete need no application code. Besides the two searched columns it holds
+an `owner` column ("#<user_id>#"), so a query can restrict matches to one
+user inside the MATCH itself instead of matching every user's entries and
+filtering after the join. The delimiters keep "#1#" from matching "#11#",
+and give ids under 100 the three characters a trigram needs. Other engines
+have no index and search falls back to LIKE.
+"""
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "vault_entries_fts"
+
+_TRIGGERS = ["vault_entries_fts_ai", "vault_entries_fts_ad", "vault_entries_fts_au"]
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        site_name, site_url, owner, tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vault_entries_fts_ai AFTER INSERT ON vault_entries BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, site_name, site_url, owner)
+        VALUES (new.id, new.site_name, new.site_url, '#' || new.user_id || '#');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vault_entries_fts_ad AFTER DELETE ON vault_entries BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vault_entries_fts_au AFTER UPDATE OF site_name, site_url, user_id ON vault_entries BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, site_name, site_url, owner)
+        VALUES (new.id, new.site_name, new.site_url, '#' || new.user_id || '#');
+    END
+    """,
+]
+
+def owner_token(user_id: int) -> str:
+    """The `owner` column value for a user's entries."""
+    return f"#{user_id}#"
+
+def install_search_index(target, connection, **kw) -> None:
+    """
+    metadata "after_create" hook. Creates the index if missing and backfills it
+    from existing rows, so databases created before the index get it too. An
+    index from before the `owner` column is dropped and rebuilt.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info({FTS_TABLE})"))}
+    try:
+        if columns and "owner" not in columns:
+            connection.execute(text(f"DROP TABLE {FTS_TABLE}"))
+            for trigger in _TRIGGERS:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        for statement in _DDL:
+            connection.execute(text(statement))
+        if "owner" not in columns:
+            connection.execute(text(f"""
+                INSERT INTO {FTS_TABLE}(rowid, site_name, site_url, owner)
+                SELECT id, site_name, site_url, '#' || user_id || '#' FROM vault_entries
+            """))
+    except Exception:
+        # SQLite built without FTS5 / trigram (< 3.34): search falls back to LIKE
+        logger.warning("Could not create the %s search index; falling back to LIKE search", FTS_TABLE, exc_info=True)
+
+def drop_search_index(target, connection, **kw) -> None:
+    """metadata "before_drop" hook; the virtual table is not part of the metadata."""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
@@ -1,18 +1,98 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./securepass.db"
+from app.core import metrics
+from app.core.config import settings
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+def _is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+def _engine_kwargs(url: URL) -> dict:
+    if not _is_sqlite(url):
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_pre_ping": True,
+        }
+    kwargs = {"connect_args": {"check_same_thread": False}}
+    # In-memory databases use a single static connection; pool sizing does not apply
+    if url.database not in (None, "", ":memory:"):
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return kwargs
+
+def _install_sqlite_pragmas(sync_engine, read_only: bool = False) -> None:
+    """
+    WAL lets readers proceed while a writer commits, and busy_timeout makes
+    writers wait for the lock instead of failing with "database is locked".
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def _create_async_engine(url_string: str, read_only: bool = False) -> AsyncEngine:
+    url = make_url(url_string)
+    async_engine = create_async_engine(url, **_engine_kwargs(url))
+    if _is_sqlite(url):
+        _install_sqlite_pragmas(async_engine.sync_engine, read_only=read_only)
+    return async_engine
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = _create_async_engine(SQLALCHEMY_DATABASE_URL)
+# expire_on_commit=False: attribute access after commit must not trigger implicit (sync) IO
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
+
+# Read-only pool for GET endpoints; falls back to the primary engine when disabled
+if settings.DB_READ_POOL_ENABLED:
+    async_read_engine = _create_async_engine(
+        settings.DATABASE_READ_URL or SQLALCHEMY_DATABASE_URL, read_only=True
+    )
+else:
+    async_read_engine = async_engine
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Sync engine on the same database (default sync driver) for schema creation and scripts
+engine = create_engine(_url.set(drivername=_url.get_backend_name()), **_engine_kwargs(_url))
+if _is_sqlite(_url):
+    _install_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Also feeds the db span of profiled requests
+if settings.METRICS_ENABLED or settings.PROFILING_ENABLED:
+    metrics.instrument_engine(async_engine.sync_engine, "primary")
+    if async_read_engine is not async_engine:
+        metrics.instrument_engine(async_read_engine.sync_engine, "read")
+    metrics.instrument_engine(engine, "sync")
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Session for read-only endpoints. Writes through it fail when the read pool is enabled."""
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,40 +1,51 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import vault, auth, share, generator
+from app.api.v1 import vault, auth, share, generator, status
 from app.core.config import settings
-from app.db.session import engine
-from app.db.models import Base
+from app.db.init_db import create_schema
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.core.limiter import limiter
-from secure import Secure
+from app.core import metrics, profiling
+from app.core.middleware import CompressionMiddleware, SecurityHeadersMiddleware
+from app.core.executor import ServiceOverloaded, service_overloaded_handler
+from app.services import pwned_service, audit_service, share_service, strength_service
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_CREATE_SCHEMA_ON_STARTUP:
+        await create_schema()
+    if settings.STRENGTH_PREWARM_ON_STARTUP:
+        # Not awaited: the worker serves requests while zxcvbn loads
+        asyncio.get_running_loop().run_in_executor(None, strength_service.prewarm)
+    await pwned_service.startup()
+    reaper = asyncio.create_task(share_service.run_reaper()) if settings.SHARE_REAPER_ENABLED else None
+    flusher = asyncio.create_task(metrics.run_flusher()) if settings.METRICS_MULTIPROC_DIR else None
+    yield
+    for task in (reaper, flusher):
+        if task is not None:
+            task.cancel()
+    await pwned_service.shutdown()
+    audit_service.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
-@app.middleware("http")
-async def add_security_headers(request, call_next):
-    response = await call_next(request)
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data:;"
-    )
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    return response
+app.add_middleware(SecurityHeadersMiddleware)
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    metrics.rate_limited.inc(route=metrics.route_template(request.scope))
+    return _rate_limit_exceeded_handler(request, exc)
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.add_exception_handler(ServiceOverloaded, service_overloaded_handler)
 
 # Set all CORS enabled origins
 app.add_middleware(
@@ -43,12 +54,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Share-Metadata"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Outermost, so latency includes every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(vault.router, prefix=f"{settings.API_V1_STR}/vault", tags=["vault"])
 app.include_router(share.router, prefix=f"{settings.API_V1_STR}/share", tags=["share"])
 app.include_router(generator.router, prefix=f"{settings.API_V1_STR}/generator", tags=["generator"])
+app.include_router(status.router, prefix=f"{settings.API_V1_STR}/status", tags=["status"])
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def root():
@@ -1,10 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+from app.core.config import settings
+
 class ShareCreate(BaseModel):
     content: str
-    ttl_minutes: int = 60 # Default to 1 hour (if not read)
+    ttl_minutes: int = Field(60, ge=1, le=settings.SHARE_MAX_TTL_MINUTES) # Default to 1 hour (if not read)
 
 class ShareResponse(BaseModel):
     uuid: str
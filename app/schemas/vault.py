@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from pydantic import BaseModel, HttpUrl, Field
+from typing import Optional, List
 from datetime import datetime
 
 class VaultEntryBase(BaseModel):
@@ -25,6 +25,31 @@ class VaultEntryDecrypted(VaultEntryRead):
 class VaultRevealRequest(BaseModel):
     master_password: str
 
+class VaultBatchRevealRequest(BaseModel):
+    entry_ids: List[int] = Field(..., min_length=1, max_length=200)
+    master_password: str
+
+class VaultAuditRequest(BaseModel):
+    master_password: str
+
+class VaultBatchRevealItem(BaseModel):
+    id: int
+    ok: bool
+    entry: Optional[VaultEntryDecrypted] = None
+    error: Optional[str] = None
+
+class VaultBatchRevealResponse(BaseModel):
+    results: List[VaultBatchRevealItem]
+
+class VaultImportError(BaseModel):
+    row: int
+    error: str
+
+class VaultImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[VaultImportError]
+
 class PasswordHealthCheck(BaseModel):
     password: str
 
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import multiprocessing
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services import health_service, pwned_service, vault_service
+
+# zxcvbn is pure Python and holds the GIL, so bulk scoring goes to processes.
+# "spawn" keeps the children clean of the parent's threads and open sockets.
+_strength_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_strength_pool() -> ProcessPoolExecutor:
+    global _strength_pool
+    if _strength_pool is None:
+        _strength_pool = ProcessPoolExecutor(
+            max_workers=settings.AUDIT_STRENGTH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _strength_pool
+
+def shutdown() -> None:
+    global _strength_pool
+    if _strength_pool is not None:
+        _strength_pool.shutdown(wait=False, cancel_futures=True)
+        _strength_pool = None
+
+def _line(payload: dict) -> str:
+    return json.dumps(payload, default=str) + "\n"
+
+async def _audit_passwords(passwords: List[str]) -> List[Tuple[dict, int]]:
+    """
+    (strength, breach count) per password. Strength scoring runs on the
+    process pool in AUDIT_CHUNK_SIZE chunks while the breach lookups run
+    concurrently on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_strength_pool()
+    breach_slots = asyncio.Semaphore(settings.AUDIT_BREACH_CONCURRENCY)
+
+    async def breach_count(password: str) -> int:
+        async with breach_slots:
+            return await pwned_service.check_pwned_password(password)
+
+    size = settings.AUDIT_CHUNK_SIZE
+    strengths = asyncio.gather(*(
+        loop.run_in_executor(pool, health_service.score_passwords, passwords[i:i + size])
+        for i in range(0, len(passwords), size)
+    ))
+    counts = await asyncio.gather(*(breach_count(password) for password in passwords))
+    scored = [strength for chunk in await strengths for strength in chunk]
+    return list(zip(scored, counts))
+
+async def audit_vault(user_id: int, master_password: str) -> AsyncIterator[str]:
+    """
+    Streams an NDJSON audit of the user's vault, one line per entry in id
+    order, then a summary line. Uses its own session since it outlives the
+    request handler.
+
+    Entries are decrypted AUDIT_BATCH_SIZE at a time and only the current
+    page's plaintexts are held. Duplicates are grouped by an HMAC under a key
+    that lives for this call only, never by plaintext: a first pass counts
+    each digest, the second decrypts again and audits page by page. Each
+    distinct password is scored and looked up once; its result is kept, by
+    digest, until its last occurrence has been written.
+    """
+    digest_key = secrets.token_bytes(32)
+
+    def digest(password: str) -> bytes:
+        return hmac.new(digest_key, password.encode(), hashlib.sha256).digest()
+
+    async with AsyncSessionLocal() as db:
+        occurrences: Dict[bytes, int] = {}
+        async for results in vault_service.iter_revealed_entries(db, master_password, user_id, settings.AUDIT_BATCH_SIZE):
+            for result in results:
+                if result["ok"]:
+                    key = digest(result["entry"]["decrypted_password"])
+                    occurrences[key] = occurrences.get(key, 0) + 1
+
+        known: Dict[bytes, dict] = {}
+        entries = unique = failed = weak = pwned = reused = 0
+        async for results in vault_service.iter_revealed_entries(db, master_password, user_id, settings.AUDIT_BATCH_SIZE):
+            fresh: Dict[bytes, str] = {}
+            for result in results:
+                if result["ok"]:
+                    result["digest"] = digest(result["entry"]["decrypted_password"])
+                    if result["digest"] not in known:
+                        fresh.setdefault(result["digest"], result["entry"]["decrypted_password"])
+
+            audited = await _audit_passwords(list(fresh.values()))
+            for key, (strength, count) in zip(fresh, audited):
+                # An entry added between the passes has no count; treat it as unique
+                total = occurrences.pop(key, 1)
+                known[key] = {"strength": strength, "count": count, "reuse_count": total, "left": total}
+            unique += len(fresh)
+            del fresh
+
+            lines = []
+            for result in results:
+                entries += 1
+                if not result["ok"]:
+                    failed += 1
+                    lines.append(_line({"type": "entry", "id": result["id"], "error": result["error"]}))
+                    continue
+                group = known[result["digest"]]
+                strength, count = group["strength"], group["count"]
+                weak += strength["score"] < 3
+                pwned += count > 0
+                reused += group["reuse_count"] > 1
+                lines.append(_line({
+                    "type": "entry",
+                    "id": result["id"],
+                    "site_name": result["entry"]["site_name"],
+                    "score": strength["score"],
+                    "feedback": strength["feedback"],
+                    "is_pwned": count > 0,
+                    "pwned_count": count,
+                    "reuse_count": group["reuse_count"],
+                }))
+                group["left"] -= 1
+                if group["left"] <= 0:
+                    del known[result["digest"]]
+            del results
+            yield "".join(lines)
+
+    yield _line({
+        "type": "summary",
+        "entries": entries,
+        "unique_passwords": unique,
+        "failed": failed,
+        "weak": weak,
+        "pwned": pwned,
+        "reused": reused,
+    })
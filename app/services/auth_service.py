@@ -1,7 +1,7 @@
 import pyotp
 from typing import Tuple
-from zxcvbn import zxcvbn
 from fastapi import HTTPException
+from app.services.strength_service import estimate_strength
 
 def generate_totp_secret() -> str:
     return pyotp.random_base32()
@@ -15,12 +15,12 @@ def get_totp_uri(secret: str, email: str, issuer_name: str = "SecurePass") -> st
     return totp.provisioning_uri(name=email, issuer_name=issuer_name)
 
 def validate_password_strength(password: str, user_inputs: list = None) -> None:
-    results = zxcvbn(password, user_inputs=user_inputs)
+    results = estimate_strength(password, user_inputs=user_inputs)
     if results["score"] < 3:
         feedback_parts = []
-        if results["feedback"]["warning"]:
-            feedback_parts.append(results["feedback"]["warning"])
-        feedback_parts.extend(results["feedback"]["suggestions"])
+        if results["warning"]:
+            feedback_parts.append(results["warning"])
+        feedback_parts.extend(results["suggestions"])
         feedback = ", ".join(feedback_parts)
         
         raise HTTPException(
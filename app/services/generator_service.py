@@ -1,35 +1,146 @@
-import secrets
+import math
+import os
 import string
+from array import array
+from typing import List, Optional
 
-def generate_strong_password(
+SYMBOLS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+
+# EFF large wordlist (7776 words, "<dice>\t<word>" per line), CC BY 3.0
+WORDLIST_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources", "eff_large_wordlist.txt")
+
+def _char_classes(include_uppercase: bool, include_digits: bool, include_symbols: bool) -> List[bytes]:
+    classes = [string.ascii_lowercase.encode()]
+    if include_uppercase:
+        classes.append(string.ascii_uppercase.encode())
+    if include_digits:
+        classes.append(string.digits.encode())
+    if include_symbols:
+        classes.append(SYMBOLS.encode())
+    return classes
+
+def _sampling_table(alphabet: bytes):
+    """
+    bytes.translate table for unbiased sampling: byte b maps to alphabet[b % n]
+    when b < 256 - 256 % n; the remaining bytes are deleted (rejected), so every
+    character is equally likely and a whole buffer is mapped in one C call.
+    """
+    n = len(alphabet)
+    limit = 256 - 256 % n
+    table = bytes(alphabet[b % n] if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256)), limit / 256
+
+def password_entropy_bits(
+    length: int,
+    include_uppercase: bool = True,
+    include_digits: bool = True,
+    include_symbols: bool = True
+) -> float:
+    """
+    log2 of the number of passwords the generator can produce: strings of
+    `length` over the alphabet that contain every selected optional class.
+    Lowercase is always in the alphabet but never required, so only the
+    optional classes enter the inclusion-exclusion.
+    """
+    classes = _char_classes(include_uppercase, include_digits, include_symbols)
+    alphabet_size = sum(len(c) for c in classes)
+    required = [len(c) for c in classes[1:]]
+    total = 0
+    for mask in range(1 << len(required)):
+        excluded = sum(size for i, size in enumerate(required) if mask >> i & 1)
+        total += (-1) ** bin(mask).count("1") * (alphabet_size - excluded) ** length
+    return round(math.log2(total), 2) if total > 0 else 0.0
+
+def generate_passwords(
+    count: int = 1,
     length: int = 16,
     include_uppercase: bool = True,
     include_digits: bool = True,
     include_symbols: bool = True
-) -> str:
+) -> List[str]:
+    """
+    Generates `count` passwords from one os.urandom buffer. Characters are
+    drawn by rejection sampling; a password missing a required class is
+    discarded and redrawn, so results are uniform over all valid passwords.
+    """
     if length < 8:
         raise ValueError("Password length must be at least 8 characters.")
 
-    alphabet = string.ascii_lowercase
-    required_chars = []
+    classes = _char_classes(include_uppercase, include_digits, include_symbols)
+    alphabet = b"".join(classes)
+    table, rejected, accept_rate = _sampling_table(alphabet)
 
-    if include_uppercase:
-        alphabet += string.ascii_uppercase
-        required_chars.append(secrets.choice(string.ascii_uppercase))
-    
-    if include_digits:
-        alphabet += string.digits
-        required_chars.append(secrets.choice(string.digits))
-        
-    if include_symbols:
-        symbols = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        alphabet += symbols
-        required_chars.append(secrets.choice(symbols))
-        
-    # Fill the rest
-    remaining_length = length - len(required_chars)
-    password_chars = required_chars + [secrets.choice(alphabet) for _ in range(remaining_length)]
-    
-    secrets.SystemRandom().shuffle(password_chars)
-    
-    return ''.join(password_chars)
+    passwords = []
+    stream = b""
+    pos = 0
+    while len(passwords) < count:
+        if len(stream) - pos < length:
+            # 10% headroom over the expected need; rarely a second draw is required
+            needed = (count - len(passwords)) * length
+            stream = stream[pos:] + os.urandom(int(needed / accept_rate * 1.1) + 64).translate(table, rejected)
+            pos = 0
+            continue
+        candidate = stream[pos:pos + length]
+        pos += length
+        if all(candidate.translate(None, required) != candidate for required in classes[1:]):
+            passwords.append(candidate.decode('ascii'))
+    return passwords
+
+def generate_strong_password(
+    length: int = 16,
+    include_uppercase: bool = True,
+    include_digits: bool = True,
+    include_symbols: bool = True
+) -> str:
+    return generate_passwords(1, length, include_uppercase, include_digits, include_symbols)[0]
+
+class Wordlist:
+    """Words packed into one bytes blob with an offsets array, loaded once."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            words = [line.split()[-1] for line in f if line.strip()]
+        self.blob = b"".join(words)
+        self.offsets = array("I", [0])
+        for word in words:
+            self.offsets.append(self.offsets[-1] + len(word))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].decode('ascii')
+
+_wordlist: Optional[Wordlist] = None
+
+def get_wordlist() -> Wordlist:
+    global _wordlist
+    if _wordlist is None:
+        _wordlist = Wordlist(WORDLIST_PATH)
+    return _wordlist
+
+def passphrase_entropy_bits(words: int) -> float:
+    return round(words * math.log2(len(get_wordlist())), 2)
+
+def generate_passphrases(count: int = 1, words: int = 6, separator: str = "-") -> List[str]:
+    """
+    Diceware passphrases of `words` words from the EFF large wordlist.
+    Word indexes come from 16-bit samples of one urandom buffer, rejecting
+    samples above the largest multiple of the list size.
+    """
+    if words < 3:
+        raise ValueError("Passphrases need at least 3 words.")
+
+    wordlist = get_wordlist()
+    n = len(wordlist)
+    limit = 65536 - 65536 % n
+    needed = count * words
+    indexes: List[int] = []
+    while len(indexes) < needed:
+        samples = array("H", os.urandom(int((needed - len(indexes)) * 65536 / limit * 1.1 + 8) * 2))
+        indexes.extend(sample % n for sample in samples if sample < limit)
+
+    return [
+        separator.join(wordlist[index] for index in indexes[i:i + words])
+        for i in range(0, needed, words)
+    ]
@@ -1,12 +1,18 @@
-from zxcvbn import zxcvbn
+from app.services.strength_service import estimate_strength
 
 def check_password_strength(password: str) -> dict:
     """
-    Calculates password strength using zxcvbn.
+    Calculates password strength using the shared strength engine (zxcvbn).
     Returns a dictionary with score (0-4) and feedback.
     """
-    result = zxcvbn(password)
+    result = estimate_strength(password)
     return {
         "score": result["score"],
-        "feedback": [result["feedback"]["warning"]] if result["feedback"]["warning"] else result["feedback"]["suggestions"]
+        "feedback": [result["warning"]] if result["warning"] else result["suggestions"]
     }
+
+def score_passwords(passwords: list) -> list:
+    """
+    Scores a chunk of passwords. Module-level so it can be shipped to a process pool.
+    """
+    return [check_password_strength(password) for password in passwords]
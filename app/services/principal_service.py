@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models import User
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers. Load `User` by id to modify it."""
+    id: int
+    email: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, is_active=user.is_active)
+
+# Keyed by SHA-256 of the raw token; the token includes its signature, so a hit
+# means the exact token was already verified
+_principals = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Bumped on invalidation; cached entries from an older generation are ignored
+_lock = threading.Lock()
+_generations: Dict[int, int] = {}
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+def get_cached(token: str) -> Optional[Principal]:
+    cached = _principals.get(_token_key(token))
+    if cached is None:
+        return None
+    principal, cached_generation = cached
+    if _generations.get(principal.id, 0) != cached_generation:
+        return None
+    return principal
+
+def generation(user_id: int) -> int:
+    """Read before loading the user, and pass to `cache`, so a concurrent invalidation wins."""
+    return _generations.get(user_id, 0)
+
+def cache(token: str, principal: Principal, expires_at: float, generation: int) -> None:
+    ttl = min(settings.PRINCIPAL_CACHE_TTL_SECONDS, expires_at - time.time())
+    if ttl <= 0:
+        return
+    _principals.set(_token_key(token), (principal, generation), ttl=ttl)
+
+def invalidate_user(user_id: int) -> None:
+    """Drops every cached principal of this user (all of their tokens)."""
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+
+def clear() -> None:
+    _principals.clear()
+
+# Changes to the fields that decide access invalidate once they are committed,
+# whichever code path made them
+_WATCHED = ("is_active", "totp_secret", "email")
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _WATCHED):
+                session.info.setdefault("principal_invalidate", set()).add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            session.info.setdefault("principal_invalidate", set()).add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop("principal_invalidate", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("principal_invalidate", None)
@@ -0,0 +1,189 @@
+"""
+Offline Pwned Passwords corpus.
+
+The SHA-1 dump ("HASH:COUNT" per line, ordered by hash) is converted once into
+a compact binary file that is memory-mapped and searched in place:
+
+    [Magic (8)][Record count (8)][Fan-out table (65537 x 8)][Records...]
+    Record: [SHA-1 (20)][Count (4)]
+
+The fan-out table holds, for every 2-byte hash prefix, the index of its first
+record, so a lookup is one table read plus a binary search over ~15k records
+for a billion-entry corpus. An optional Bloom filter file answers most
+negative lookups without touching the corpus pages at all.
+
+Usage:
+    python -m app.services.pwned_corpus build pwned-passwords-sha1-ordered-by-hash.txt pwned.bin --bloom pwned.bloom
+    python -m app.services.pwned_corpus lookup pwned.bin password
+"""
+import argparse
+import hashlib
+import math
+import mmap
+import struct
+import sys
+from array import array
+from typing import Optional
+
+MAGIC = b"SPPWN001"
+BLOOM_MAGIC = b"SPBLM001"
+HASH_SIZE = 20
+RECORD = struct.Struct("<20sI")
+FANOUT_SIZE = 65536 + 1
+HEADER_SIZE = len(MAGIC) + 8 + FANOUT_SIZE * 8
+
+def _bloom_positions(digest: bytes, bits: int, hashes: int):
+    # The digest is already uniform, so two slices of it drive double hashing
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:16], "little") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+class BloomFilter:
+    """Read-only, memory-mapped Bloom filter over SHA-1 digests."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a bloom filter file")
+        self.bits, self.hashes = struct.unpack_from("<QI", self._mm, 8)
+        self._offset = 20
+
+    def __contains__(self, digest: bytes) -> bool:
+        mm, offset = self._mm, self._offset
+        for pos in _bloom_positions(digest, self.bits, self.hashes):
+            if not mm[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+class BreachCorpus:
+    """Memory-mapped sorted hash file. Only the fan-out table lives in RAM (~512 KB)."""
+
+    def __init__(self, path: str, bloom_path: Optional[str] = None):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a breach corpus file")
+        (self.count,) = struct.unpack_from("<Q", self._mm, 8)
+        self._fanout = array("Q")
+        self._fanout.frombytes(self._mm[16:HEADER_SIZE])
+        if sys.byteorder != "little":
+            self._fanout.byteswap()
+        self.bloom = BloomFilter(bloom_path) if bloom_path else None
+
+    def lookup(self, digest: bytes) -> int:
+        """Returns the breach count for a raw 20-byte SHA-1 digest, 0 if absent."""
+        if self.bloom is not None and digest not in self.bloom:
+            return 0
+
+        bucket = int.from_bytes(digest[:2], "big")
+        lo, hi = self._fanout[bucket], self._fanout[bucket + 1]
+        mm = self._mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER_SIZE + mid * RECORD.size
+            key = mm[offset:offset + HASH_SIZE]
+            if key < digest:
+                lo = mid + 1
+            elif key > digest:
+                hi = mid
+            else:
+                return RECORD.unpack_from(mm, offset)[1]
+        return 0
+
+    def lookup_password(self, password: str) -> int:
+        return self.lookup(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def close(self) -> None:
+        if self.bloom is not None:
+            self.bloom.close()
+        self._mm.close()
+        self._file.close()
+
+def build_corpus(source_path: str, output_path: str) -> int:
+    """
+    Converts a sorted "HASH:COUNT" text dump into the binary corpus format.
+    Streams the input, so memory stays flat regardless of corpus size.
+    """
+    bucket_counts = array("Q", bytes(8 * 65536))
+    count = 0
+    previous = b""
+    with open(source_path, "r", encoding="ascii") as source, open(output_path, "wb") as out:
+        out.write(bytes(HEADER_SIZE))
+        for line_no, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            hex_hash, _, seen = line.partition(":")
+            digest = bytes.fromhex(hex_hash)
+            if len(digest) != HASH_SIZE:
+                raise ValueError(f"Line {line_no}: expected a SHA-1 hash, got {hex_hash!r}")
+            if digest <= previous:
+                raise ValueError(f"Line {line_no}: input must be sorted by hash (use the 'ordered by hash' dump)")
+            previous = digest
+            out.write(RECORD.pack(digest, min(int(seen or 0), 0xFFFFFFFF)))
+            bucket_counts[int.from_bytes(digest[:2], "big")] += 1
+            count += 1
+
+        fanout = array("Q", [0])
+        for bucket_count in bucket_counts:
+            fanout.append(fanout[-1] + bucket_count)
+        if sys.byteorder != "little":
+            fanout.byteswap()
+        out.seek(0)
+        out.write(MAGIC + struct.pack("<Q", count) + fanout.tobytes())
+    return count
+
+def build_bloom(corpus_path: str, output_path: str, bits_per_entry: int = 10) -> None:
+    """Builds a Bloom filter over an existing corpus (~1% false positives at 10 bits/entry)."""
+    corpus = BreachCorpus(corpus_path)
+    try:
+        bits = max(corpus.count * bits_per_entry, 8)
+        hashes = max(1, round(bits_per_entry * math.log(2)))
+        table = bytearray((bits + 7) // 8)
+        mm = corpus._mm
+        for index in range(corpus.count):
+            offset = HEADER_SIZE + index * RECORD.size
+            for pos in _bloom_positions(mm[offset:offset + HASH_SIZE], bits, hashes):
+                table[pos >> 3] |= 1 << (pos & 7)
+    finally:
+        corpus.close()
+    with open(output_path, "wb") as out:
+        out.write(BLOOM_MAGIC + struct.pack("<QI", bits, hashes))
+        out.write(table)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build and query the offline Pwned Passwords corpus.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Convert a sorted SHA-1 dump into the binary corpus")
+    build.add_argument("source")
+    build.add_argument("output")
+    build.add_argument("--bloom", help="Also write a Bloom filter to this path")
+    build.add_argument("--bloom-bits-per-entry", type=int, default=10)
+
+    lookup = commands.add_parser("lookup", help="Look up a password in a corpus")
+    lookup.add_argument("corpus")
+    lookup.add_argument("password")
+    lookup.add_argument("--bloom")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        count = build_corpus(args.source, args.output)
+        print(f"Wrote {count} hashes to {args.output}")
+        if args.bloom:
+            build_bloom(args.output, args.bloom, args.bloom_bits_per_entry)
+            print(f"Wrote bloom filter to {args.bloom}")
+    else:
+        corpus = BreachCorpus(args.corpus, args.bloom)
+        try:
+            print(corpus.lookup_password(args.password))
+        finally:
+            corpus.close()
+
+if __name__ == "__main__":
+    main()
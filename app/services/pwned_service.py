@@ -1,30 +1,159 @@
+import asyncio
 import hashlib
+from array import array
+from typing import Dict, Optional
+
 import httpx
 
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.pwned_corpus import BreachCorpus
+
+# Suffixes are 35 hex chars; stored as 18 raw bytes (with a leading 0 nibble)
+SUFFIX_BYTES = 18
+
+class PwnedRange:
+    """
+    Parsed response of one /range/{prefix} call, kept compact for caching:
+    suffixes as one sorted run of fixed-width bytes plus a parallel count array.
+    """
+
+    __slots__ = ("suffixes", "counts")
+
+    def __init__(self, text: str):
+        suffixes = []
+        counts = array("I")
+        for line in text.splitlines():
+            suffix, _, count = line.partition(':')
+            if not count:
+                continue
+            suffixes.append(bytes.fromhex('0' + suffix.strip()))
+            counts.append(int(count))
+        # HIBP already returns suffixes sorted; sort anyway to keep lookups correct
+        if any(suffixes[i] > suffixes[i + 1] for i in range(len(suffixes) - 1)):
+            order = sorted(range(len(suffixes)), key=suffixes.__getitem__)
+            suffixes = [suffixes[i] for i in order]
+            counts = array("I", (counts[i] for i in order))
+        self.suffixes = b"".join(suffixes)
+        self.counts = counts
+
+    def lookup(self, suffix: str) -> int:
+        target = bytes.fromhex('0' + suffix)
+        lo, hi = 0, len(self.counts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self.suffixes[mid * SUFFIX_BYTES:(mid + 1) * SUFFIX_BYTES]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                return self.counts[mid]
+        return 0
+
+# App-lifetime client (keep-alive, pooled connections); created in the lifespan
+_client: Optional[httpx.AsyncClient] = None
+
+# Memory-mapped local corpus when PWNED_BACKEND == "offline"
+_corpus: Optional[BreachCorpus] = None
+
+# Parsed ranges by prefix, and in-flight fetches for single-flight de-duplication
+_ranges = TTLCache(maxsize=settings.PWNED_CACHE_SIZE, ttl=settings.PWNED_CACHE_TTL_SECONDS)
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.PWNED_API_URL,
+        timeout=settings.PWNED_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.PWNED_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PWNED_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+        headers={"User-Agent": settings.PROJECT_NAME},
+    )
+
+def _get_corpus() -> BreachCorpus:
+    global _corpus
+    if _corpus is None:
+        if not settings.PWNED_CORPUS_PATH:
+            raise RuntimeError("PWNED_BACKEND is 'offline' but PWNED_CORPUS_PATH is not set")
+        _corpus = BreachCorpus(settings.PWNED_CORPUS_PATH, settings.PWNED_BLOOM_PATH)
+    return _corpus
+
+async def startup() -> None:
+    global _client
+    if settings.PWNED_BACKEND == "offline":
+        _get_corpus()
+    elif _client is None:
+        _client = _new_client()
+
+async def shutdown() -> None:
+    global _client, _corpus
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _corpus is not None:
+        _corpus.close()
+        _corpus = None
+    _inflight.clear()
+
+def clear_cache() -> None:
+    _ranges.clear()
+
+async def _fetch_range(prefix: str) -> PwnedRange:
+    global _client
+    if _client is None:
+        # Scripts and tests that never ran the app lifespan
+        _client = _new_client()
+    response = await _client.get(f"/range/{prefix}")
+    response.raise_for_status()
+    pwned_range = PwnedRange(response.text)
+    _ranges.set(prefix, pwned_range)
+    return pwned_range
+
+async def get_range(prefix: str) -> PwnedRange:
+    """
+    Returns the parsed range for a 5-char prefix from cache, or fetches it.
+    Concurrent callers for the same prefix share a single request.
+    """
+    cached = _ranges.get(prefix)
+    if cached is not None:
+        return cached
+
+    future = _inflight.get(prefix)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_range(prefix))
+        _inflight[prefix] = future
+        future.add_done_callback(lambda _: _inflight.pop(prefix, None))
+    # Shield so one cancelled caller does not cancel the fetch for everyone else
+    return await asyncio.shield(future)
+
 async def check_pwned_password(password: str) -> int:
     """
     Checks if password has been exposed in data breaches using Have I Been Pwned API via k-Anonymity.
     Returns the count of times it was seen. 0 means safe (so far).
+    With PWNED_BACKEND = "offline" the lookup never leaves the host.
     """
+    with metrics.pwned_latency.time(backend=settings.PWNED_BACKEND):
+        return await _check_pwned_password(password)
+
+async def _check_pwned_password(password: str) -> int:
+    if settings.PWNED_BACKEND == "offline":
+        return _get_corpus().lookup(hashlib.sha1(password.encode('utf-8')).digest())
+
     # 1. SHA-1 hash the password
     sha1password = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
     prefix = sha1password[:5]
     suffix = sha1password[5:]
 
-    url = f"https://api.pwnedpasswords.com/range/{prefix}"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-        except httpx.RequestError as exc:
-            print(f"An error occurred while requesting {exc.request.url!r}.")
-            return 0 # Fail safe or raise error depending on requirements
-    
-    # 3. Check if suffix is in response
-    # Response format: SUFFIX:COUNT
-    hashes = (line.split(':') for line in response.text.splitlines())
-    for h, count in hashes:
-        if h == suffix:
-            return int(count)
-    
-    return 0
+    # 2. Fetch (or reuse) the range for the prefix
+    try:
+        pwned_range = await get_range(prefix)
+    except httpx.HTTPError as exc:
+        print(f"An error occurred while requesting range {prefix!r}: {exc!r}")
+        return 0 # Fail safe or raise error depending on requirements
+
+    # 3. Check if suffix is in the range
+    return pwned_range.lookup(suffix)
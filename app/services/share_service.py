@@ -1,14 +1,25 @@
 import os
+import asyncio
 import base64
+import logging
+import random
+import struct
+import time
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from starlette.concurrency import run_in_threadpool
 
-from app.db.models import SharedSecret
+from app.db.models import SharedSecret, generate_uuid
+from app.db.session import AsyncSessionLocal
 from app.schemas.share import ShareCreate
 from app.core.config import settings
 
-def create_shared_secret(db: Session, entry: ShareCreate) -> dict:
+logger = logging.getLogger(__name__)
+
+async def create_shared_secret(db: AsyncSession, entry: ShareCreate) -> dict:
     # 1. Generate Ephemeral Key (never stored)
     key = AESGCM.generate_key(bit_length=256) # 32 bytes
     aesgcm = AESGCM(key)
@@ -33,8 +44,8 @@ def create_shared_secret(db: Session, entry: ShareCreate) -> dict:
         expires_at=expires
     )
     db.add(db_secret)
-    db.commit()
-    db.refresh(db_secret)
+    await db.commit()
+    await db.refresh(db_secret)
     
     # 4. Return Data
     # The client needs the KEY to decrypt.
@@ -47,23 +58,235 @@ def create_shared_secret(db: Session, entry: ShareCreate) -> dict:
         "expires_at": expires
     }
 
-def access_shared_secret(db: Session, secret_id: str) -> str:
-    # 1. Find
-    secret = db.query(SharedSecret).filter(SharedSecret.id == secret_id).first()
-    if not secret:
+async def access_shared_secret(db: AsyncSession, secret_id: str) -> str:
+    """
+    Burn-after-read: fetches and deletes the secret in one atomic statement, so
+    concurrent readers of the same link cannot both get it. Returns None if the
+    link is unknown, expired or already used (expired rows are left to the reaper).
+    """
+    return await _consume(db, secret_id, is_file=False)
+
+async def _consume(db: AsyncSession, secret_id: str, is_file: bool) -> Optional[str]:
+    now = datetime.utcnow()
+    consume = delete(SharedSecret).filter(
+        SharedSecret.id == secret_id,
+        SharedSecret.file_size.isnot(None) if is_file else SharedSecret.file_size.is_(None),
+        or_(SharedSecret.expires_at.is_(None), SharedSecret.expires_at > now),
+    )
+
+    if db.get_bind().dialect.delete_returning:
+        result = await db.execute(consume.returning(SharedSecret.encrypted_content))
+        content = result.scalar_one_or_none()
+        await db.commit()
+        return content
+
+    # No DELETE ... RETURNING: read, then let the DELETE decide who won
+    result = await db.execute(select(SharedSecret.encrypted_content).filter(SharedSecret.id == secret_id))
+    content = result.scalar_one_or_none()
+    if content is None:
         return None
-    
-    # 2. Check Expiry
-    if secret.expires_at and secret.expires_at < datetime.utcnow():
-        db.delete(secret)
-        db.commit()
+    result = await db.execute(consume)
+    await db.commit()
+    return content if result.rowcount == 1 else None
+
+# File shares. The ciphertext lives in SHARE_FILE_DIR/<id>.bin, never in the row:
+#   [magic 4][chunk size 4][nonce prefix 7] then chunks of [ciphertext + tag 16].
+# Chunk i uses nonce = prefix || i (4 bytes) || last flag (1 byte) and the share id
+# as AAD, so chunks cannot be reordered, dropped, truncated or moved between files.
+# The row holds the encrypted file name. Memory per transfer is about one chunk.
+FILE_MAGIC = b"SPF1"
+_FILE_HEADER = struct.Struct(">4sI7s")
+_TAG_SIZE = 16
+
+class ShareTooLarge(ValueError):
+    pass
+
+def _file_path(secret_id: str) -> str:
+    return os.path.join(settings.SHARE_FILE_DIR, f"{secret_id}.bin")
+
+def _chunk_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + struct.pack(">I?", counter, last)
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+async def create_file_share(db: AsyncSession, chunks: AsyncIterator[bytes], filename: str, ttl_minutes: int) -> dict:
+    """
+    Encrypts an uploaded byte stream chunk by chunk straight to disk.
+    The plaintext is never buffered beyond one chunk or written anywhere.
+    """
+    expires = datetime.utcnow() + timedelta(minutes=ttl_minutes)
+    key = AESGCM.generate_key(bit_length=256)
+    aesgcm = AESGCM(key)
+    secret_id = generate_uuid()
+    aad = secret_id.encode('utf-8')
+    prefix = os.urandom(7)
+    chunk_size = settings.SHARE_FILE_CHUNK_SIZE
+
+    os.makedirs(settings.SHARE_FILE_DIR, exist_ok=True)
+    final_path = _file_path(secret_id)
+    part_path = final_path + ".part"
+    size = 0
+    counter = 0
+    buffer = bytearray()
+    out = await run_in_threadpool(open, part_path, "wb")
+    try:
+        await run_in_threadpool(out.write, _FILE_HEADER.pack(FILE_MAGIC, chunk_size, prefix))
+        async for data in chunks:
+            size += len(data)
+            if size > settings.SHARE_FILE_MAX_BYTES:
+                raise ShareTooLarge(f"File exceeds {settings.SHARE_FILE_MAX_BYTES} bytes")
+            buffer += data
+            # Hold back at least one byte: the last chunk is only known at end of stream
+            while len(buffer) > chunk_size:
+                block = bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+                await run_in_threadpool(out.write, aesgcm.encrypt(_chunk_nonce(prefix, counter, False), block, aad))
+                counter += 1
+        await run_in_threadpool(out.write, aesgcm.encrypt(_chunk_nonce(prefix, counter, True), bytes(buffer), aad))
+        await run_in_threadpool(out.close)
+        os.replace(part_path, final_path)
+    except BaseException:
+        out.close()
+        _unlink_quietly(part_path)
+        raise
+
+    nonce = os.urandom(12)
+    encrypted_name = base64.urlsafe_b64encode(nonce + aesgcm.encrypt(nonce, filename.encode('utf-8'), aad)).decode('utf-8')
+    db.add(SharedSecret(id=secret_id, encrypted_content=encrypted_name, expires_at=expires, file_size=size))
+    try:
+        await db.commit()
+    except BaseException:
+        _unlink_quietly(final_path)
+        raise
+
+    key_b64 = base64.urlsafe_b64encode(key).decode('utf-8')
+    return {
+        "uuid": secret_id,
+        "share_url": f"{settings.API_V1_STR}/share/file/{secret_id}#{key_b64}",
+        "secret_key": key_b64,
+        "expires_at": expires
+    }
+
+async def open_file_share(db: AsyncSession, secret_id: str) -> Optional[Tuple[str, int, AsyncIterator[bytes]]]:
+    """
+    Claims a file share (atomically, like access_shared_secret) and returns
+    (encrypted file name, ciphertext length, ciphertext stream). The file is
+    only opened once the stream starts; the caller must call
+    discard_file_share afterwards, whether or not the stream ran.
+    """
+    encrypted_name = await _consume(db, secret_id, is_file=True)
+    if encrypted_name is None:
         return None
-        
-    # 3. Get Content (Encrypted)
-    content = secret.encrypted_content
-    
-    # 4. DESTROY (Self-Destruct)
-    db.delete(secret)
-    db.commit()
-    
-    return content
+    path = _file_path(secret_id)
+    try:
+        length = os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+    async def stream() -> AsyncIterator[bytes]:
+        handle = await run_in_threadpool(open, path, "rb")
+        try:
+            while True:
+                block = await run_in_threadpool(handle.read, settings.SHARE_FILE_CHUNK_SIZE + _TAG_SIZE)
+                if not block:
+                    break
+                yield block
+        finally:
+            handle.close()
+            _unlink_quietly(path)
+
+    return encrypted_name, length, stream()
+
+def discard_file_share(secret_id: str) -> None:
+    """Deletes a claimed file share's ciphertext. Safe to call more than once."""
+    _unlink_quietly(_file_path(secret_id))
+
+def decrypt_file_share(key_b64: str, secret_id: str, blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Client-side counterpart of create_file_share: decrypts a downloaded
+    ciphertext stream chunk by chunk. Raises InvalidTag if the stream was
+    tampered with, reordered or truncated.
+    """
+    aesgcm = AESGCM(base64.urlsafe_b64decode(key_b64))
+    aad = secret_id.encode('utf-8')
+    buffer = bytearray()
+    header = None
+    counter = 0
+    for data in blocks:
+        buffer += data
+        if header is None:
+            if len(buffer) < _FILE_HEADER.size:
+                continue
+            magic, chunk_size, prefix = _FILE_HEADER.unpack(bytes(buffer[:_FILE_HEADER.size]))
+            if magic != FILE_MAGIC:
+                raise ValueError("Not a SecurePass file share")
+            del buffer[:_FILE_HEADER.size]
+            header = (chunk_size + _TAG_SIZE, prefix)
+        sealed_size, prefix = header
+        while len(buffer) > sealed_size:
+            yield aesgcm.decrypt(_chunk_nonce(prefix, counter, False), bytes(buffer[:sealed_size]), aad)
+            del buffer[:sealed_size]
+            counter += 1
+    if header is None:
+        raise ValueError("Truncated file share")
+    yield aesgcm.decrypt(_chunk_nonce(header[1], counter, True), bytes(buffer), aad)
+
+async def reap_expired_secrets(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Deletes expired secrets (and their files) in batches of `batch_size`, one
+    short transaction each, so the write lock is released between batches.
+    Returns rows deleted.
+    """
+    now = datetime.utcnow()
+    reaped = 0
+    while True:
+        result = await db.execute(
+            select(SharedSecret.id, SharedSecret.file_size).filter(SharedSecret.expires_at <= now).limit(batch_size)
+        )
+        expired = result.all()
+        if expired:
+            await db.execute(delete(SharedSecret).filter(SharedSecret.id.in_([row.id for row in expired])))
+        await db.commit()
+        for row in expired:
+            if row.file_size is not None:
+                _unlink_quietly(_file_path(row.id))
+        reaped += len(expired)
+        if len(expired) < batch_size:
+            return reaped
+        # Let other writers in between batches
+        await asyncio.sleep(0)
+
+_reaper_stats = {
+    "runs": 0,
+    "reaped_total": 0,
+    "last_reaped": 0,
+    "last_run_ms": 0.0,
+    "last_run_at": None,
+}
+
+async def run_reaper() -> None:
+    """Lifespan task: reaps expired secrets every SHARE_REAPER_INTERVAL_SECONDS (+ jitter)."""
+    while True:
+        await asyncio.sleep(settings.SHARE_REAPER_INTERVAL_SECONDS + random.uniform(0, settings.SHARE_REAPER_JITTER_SECONDS))
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                reaped = await reap_expired_secrets(db, settings.SHARE_REAPER_BATCH_SIZE)
+        except Exception:
+            logger.exception("Share reaper run failed")
+            continue
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _reaper_stats["runs"] += 1
+        _reaper_stats["reaped_total"] += reaped
+        _reaper_stats["last_reaped"] = reaped
+        _reaper_stats["last_run_ms"] = round(elapsed_ms, 3)
+        _reaper_stats["last_run_at"] = datetime.utcnow()
+        if reaped:
+            logger.info("Reaped %d expired shared secrets in %.1f ms", reaped, elapsed_ms)
+
+def reaper_stats() -> dict:
+    return dict(_reaper_stats)
@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import math
+import string
+import threading
+import time
+import zlib
+from typing import List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Results keyed by HMAC(password + user inputs); the plaintext never becomes a key
+_results = TTLCache(maxsize=settings.STRENGTH_CACHE_SIZE, ttl=settings.STRENGTH_CACHE_TTL_SECONDS)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "cache_hits": 0,
+    "zxcvbn_calls": 0,
+    "long_input_calls": 0,
+    "zxcvbn_seconds_total": 0.0,
+    "zxcvbn_seconds_max": 0.0,
+}
+
+def _cache_key(password: str, user_inputs: Optional[List[str]]) -> bytes:
+    msg = "\0".join([password, *(str(value) for value in user_inputs or [])])
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), msg.encode('utf-8'), hashlib.sha256).digest()
+
+def _score_from_guesses_log10(guesses_log10: float) -> int:
+    # Same thresholds zxcvbn uses to turn guesses into a 0-4 score
+    for score, limit in enumerate((3, 6, 8, 10)):
+        if guesses_log10 < limit:
+            return score
+    return 4
+
+def _pool_bits(password: str) -> float:
+    """log2 of the brute-force alphabet size for the character classes in use."""
+    pool = 0
+    chars = set(password)
+    if chars & set(string.ascii_lowercase):
+        pool += 26
+    if chars & set(string.ascii_uppercase):
+        pool += 26
+    if chars & set(string.digits):
+        pool += 10
+    if chars & set(string.punctuation + " "):
+        pool += 33
+    if any(ord(c) > 127 for c in chars):
+        pool += 100
+    return math.log2(max(pool, 1))
+
+def _length_credit_bits(password: str, prefix: str) -> float:
+    """
+    Extra bits for the part of a long password beyond the prefix zxcvbn saw.
+    The tail is measured by how much it adds to the compressed size, so
+    repeats of the prefix and long runs earn (almost) nothing; tails that
+    compress to under a bit per character earn nothing at all.
+    """
+    tail = len(password) - len(prefix)
+    if tail <= 0:
+        return 0.0
+    added = len(zlib.compress(password.encode("utf-8"), 9)) - len(zlib.compress(prefix.encode("utf-8"), 9))
+    bits = max(added, 0) * 8
+    if bits < tail:
+        return 0.0
+    return min(bits, _pool_bits(password) * tail)
+
+def _zxcvbn():
+    """
+    zxcvbn builds its frequency dictionaries at import time, so it is imported
+    on first use (or by `prewarm`) instead of by every process importing the app.
+    """
+    from zxcvbn import zxcvbn
+    return zxcvbn
+
+def prewarm() -> None:
+    """Loads zxcvbn ahead of the first request (STRENGTH_PREWARM_ON_STARTUP)."""
+    _zxcvbn()("prewarm-Sample-1")
+
+def estimate_strength(password: str, user_inputs: Optional[List[str]] = None) -> dict:
+    """
+    Shared password strength estimate used by registration and health checks.
+    Returns {"score": 0-4, "warning": str, "suggestions": [str]}.
+
+    zxcvbn is superlinear in length, so only the first STRENGTH_MAX_LENGTH
+    characters are matched; the rest can only add the length credit from
+    `_length_credit_bits`, which keeps latency predictable without letting
+    repetition of a weak password score as strong.
+    """
+    key = _cache_key(password, user_inputs)
+    cached = _results.get(key)
+    with _stats_lock:
+        _stats["calls"] += 1
+        if cached is not None:
+            _stats["cache_hits"] += 1
+    if cached is not None:
+        return cached
+
+    prefix = password[:settings.STRENGTH_MAX_LENGTH]
+    started = time.perf_counter()
+    analysis = _zxcvbn()(prefix, user_inputs=user_inputs)
+    elapsed = time.perf_counter() - started
+    metrics.strength_latency.observe(elapsed)
+    result = {
+        "score": analysis["score"],
+        "warning": analysis["feedback"]["warning"],
+        "suggestions": analysis["feedback"]["suggestions"],
+    }
+    with _stats_lock:
+        _stats["zxcvbn_calls"] += 1
+        _stats["zxcvbn_seconds_total"] += elapsed
+        _stats["zxcvbn_seconds_max"] = max(_stats["zxcvbn_seconds_max"], elapsed)
+
+    if len(password) > len(prefix):
+        guesses_log10 = analysis["guesses_log10"] + _length_credit_bits(password, prefix) * math.log10(2)
+        result["score"] = max(result["score"], _score_from_guesses_log10(guesses_log10))
+        if result["score"] >= 3:
+            result["warning"], result["suggestions"] = "", []
+        elif not result["suggestions"]:
+            result["suggestions"] = ["Avoid long runs of repeated characters or patterns."]
+        with _stats_lock:
+            _stats["long_input_calls"] += 1
+
+    _results.set(key, result)
+    return result
+
+def stats() -> dict:
+    with _stats_lock:
+        snapshot = dict(_stats)
+    calls = snapshot["zxcvbn_calls"]
+    snapshot["zxcvbn_ms_avg"] = round(snapshot.pop("zxcvbn_seconds_total") / calls * 1000, 3) if calls else 0.0
+    snapshot["zxcvbn_ms_max"] = round(snapshot.pop("zxcvbn_seconds_max") * 1000, 3)
+    snapshot["cache_size"] = len(_results)
+    return snapshot
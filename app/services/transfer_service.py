@@ -0,0 +1,283 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.crypto import decrypt_with_data_key, encrypt_with_data_key, is_encrypted_blob
+from app.db.models import User, VaultEntry
+from app.db.session import AsyncReadSessionLocal
+from app.services import vault_service
+
+# Column names used by common password manager exports, lower-cased
+FIELD_ALIASES = {
+    "site_name": ("site_name", "name", "title", "site"),
+    "site_url": ("site_url", "url", "login_uri", "website"),
+    "password": ("password", "login_password", "site_password"),
+    "encrypted_password": ("encrypted_password",),
+}
+
+EXPORT_FIELDS = ["id", "site_name", "site_url", "encrypted_password", "created_at", "updated_at"]
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed any further; rows before it were imported."""
+
+async def _decoded(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for data in chunks:
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """
+    Parses a CSV upload record by record as bytes arrive. The first row is the
+    header. A record ends at a newline outside quotes, so quoted fields may
+    span lines; only the record being read is buffered.
+    """
+    header = None
+    pending = []
+    pending_size = 0
+    quotes = 0
+    tail = ""
+
+    def parse(record: str):
+        return next(csv.reader([record]), [])
+
+    async for text in _decoded(chunks):
+        lines = (tail + text).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            pending.append(line)
+            pending_size += len(line) + 1
+            quotes += line.count('"')
+            if quotes % 2:
+                if pending_size > settings.VAULT_IMPORT_MAX_RECORD_BYTES:
+                    raise ImportFormatError("Unterminated quoted field")
+                continue
+            values = parse("\n".join(pending))
+            pending, pending_size, quotes = [], 0, 0
+            if not any(values):
+                continue
+            if header is None:
+                header = [value.strip().lower() for value in values]
+            else:
+                yield dict(zip(header, values))
+        if len(tail) > settings.VAULT_IMPORT_MAX_RECORD_BYTES:
+            raise ImportFormatError("Record too large")
+
+    if tail:
+        pending.append(tail)
+        quotes += tail.count('"')
+    if pending:
+        if quotes % 2:
+            raise ImportFormatError("Unterminated quoted field")
+        values = parse("\n".join(pending))
+        if any(values) and header is not None:
+            yield dict(zip(header, values))
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """
+    Parses a JSON array of objects, or newline-delimited objects, one element
+    at a time as bytes arrive, so the whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    stream = _decoded(chunks).__aiter__()
+    buffer = ""
+    exhausted = False
+    in_array = None
+
+    async def more() -> bool:
+        nonlocal buffer, exhausted
+        if exhausted:
+            return False
+        try:
+            buffer += await stream.__anext__()
+        except StopAsyncIteration:
+            exhausted = True
+        return not exhausted
+
+    while True:
+        buffer = buffer.lstrip()
+        if in_array is None:
+            if not buffer:
+                if not await more():
+                    return
+                continue
+            in_array = buffer.startswith("[")
+            if in_array:
+                buffer = buffer[1:]
+            continue
+        if in_array and buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        if in_array and buffer.startswith("]"):
+            return
+        if not buffer:
+            if not await more():
+                if in_array:
+                    raise ImportFormatError("Unterminated JSON array")
+                return
+            continue
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if len(buffer) > settings.VAULT_IMPORT_MAX_RECORD_BYTES:
+                raise ImportFormatError("Record too large or malformed")
+            if not await more():
+                raise ImportFormatError("Malformed JSON")
+            continue
+        buffer = buffer[end:]
+        yield record
+
+def _normalize(record: object) -> dict:
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+
+    def field(name: str) -> Optional[str]:
+        for alias in FIELD_ALIASES[name]:
+            value = lowered.get(alias)
+            if value not in (None, ""):
+                return str(value)
+        return None
+
+    row = {name: field(name) for name in FIELD_ALIASES}
+    if not row["site_name"]:
+        raise ValueError("Missing site name")
+    if not row["password"] and not row["encrypted_password"]:
+        raise ValueError("Missing password")
+    if row["encrypted_password"] and not is_encrypted_blob(row["encrypted_password"]):
+        raise ValueError("encrypted_password is not a SecurePass ciphertext")
+    return row
+
+async def import_entries(
+    db: AsyncSession,
+    user_id: int,
+    records: AsyncIterator[object],
+    master_password: Optional[str] = None,
+) -> dict:
+    """
+    Imports parsed records in batches of VAULT_IMPORT_BATCH_SIZE: each batch
+    is encrypted with the vault's data key (unlocked once) and written with
+    one executemany INSERT and one commit.
+
+    Records with `encrypted_password` (e.g. from GET /vault/export) are stored
+    as-is: with the master password they must decrypt under the data key,
+    without it they must at least be envelope blobs. Plaintext passwords need
+    the master password. Bad records are reported per row and skipped.
+    Returns {"imported", "failed", "errors"}.
+    """
+    data_key = None
+    if master_password:
+        user = await db.get(User, user_id)
+        data_key = await vault_service.unlock_vault_key(db, user, master_password, create=True)
+        if data_key is None:
+            raise ValueError("Master password does not match this vault")
+
+    imported = 0
+    failed = 0
+    errors: List[dict] = []
+    batch: List[Tuple[int, dict]] = []
+
+    def reject(row_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.VAULT_IMPORT_MAX_ERRORS:
+            errors.append({"row": row_number, "error": message})
+
+    async def flush() -> None:
+        nonlocal imported
+        # AES-GCM with the unlocked data key: microseconds per row, so inline.
+        # Going through the KDF pool could shed a later batch after earlier ones committed.
+        rows = []
+        for row_number, row in batch:
+            if not row["encrypted_password"]:
+                if data_key is None:
+                    reject(row_number, "Plaintext password requires the master password")
+                    continue
+                row["encrypted_password"] = encrypt_with_data_key(data_key, row["password"])
+            elif data_key is not None:
+                # Decrypting is what authenticates the blob as this vault's
+                try:
+                    decrypt_with_data_key(data_key, row["encrypted_password"])
+                except ValueError:
+                    reject(row_number, "encrypted_password does not decrypt with this vault's key")
+                    continue
+            rows.append(row)
+        batch.clear()
+        if not rows:
+            return
+        await db.execute(insert(VaultEntry), [
+            {
+                "site_name": row["site_name"],
+                "site_url": row["site_url"],
+                "encrypted_password": row["encrypted_password"],
+                "user_id": user_id,
+            }
+            for row in rows
+        ])
+        await db.commit()
+        imported += len(rows)
+
+    row_number = 0
+    try:
+        async for record in records:
+            row_number += 1
+            try:
+                batch.append((row_number, _normalize(record)))
+            except ValueError as e:
+                reject(row_number, str(e))
+                continue
+            if len(batch) >= settings.VAULT_IMPORT_BATCH_SIZE:
+                await flush()
+    except ImportFormatError as e:
+        reject(row_number + 1, str(e))
+    if batch:
+        await flush()
+
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+async def export_entries(user_id: int, fmt: str = "json") -> AsyncIterator[str]:
+    """
+    Streams the user's entries (passwords stay encrypted) from a server-side
+    cursor, VAULT_EXPORT_BATCH_SIZE rows at a time. `fmt` is "json" (one
+    array) or "csv". Uses its own session since it outlives the request handler.
+    """
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(
+            select(VaultEntry)
+            .filter(VaultEntry.user_id == user_id)
+            .order_by(VaultEntry.id)
+            .execution_options(yield_per=settings.VAULT_EXPORT_BATCH_SIZE)
+        )
+        if fmt == "csv":
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(EXPORT_FIELDS)
+            async for rows in result.scalars().partitions():
+                for row in rows:
+                    writer.writerow([getattr(row, name) for name in EXPORT_FIELDS])
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+            yield out.getvalue()
+            return
+
+        yield "["
+        first = True
+        async for rows in result.scalars().partitions():
+            parts = []
+            for row in rows:
+                item = json.dumps({name: getattr(row, name) for name in EXPORT_FIELDS}, default=str)
+                parts.append(item if first else "," + item)
+                first = False
+            yield "\n".join(parts)
+        yield "]\n"
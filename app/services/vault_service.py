@@ -1,13 +1,144 @@
-from sqlalchemy.orm import Session
-from app.db.models import VaultEntry
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import User, VaultEntry
+from app.db.search import FTS_TABLE, owner_token
 from app.schemas.vault import VaultEntryCreate
-from app.core.crypto import encrypt_password, decrypt_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.executor import ServiceOverloaded, kdf_executor
+from app.core.crypto import (
+    decrypt_entry,
+    decrypt_with_data_key,
+    encrypt_with_data_key,
+    generate_data_key,
+    has_envelope_marker,
+    unwrap_data_key,
+    wrap_data_key,
+)
 
-def create_vault_entry(db: Session, entry: VaultEntryCreate, user_id: int) -> VaultEntry:
+# Unlocked data keys, keyed by HMAC(wrapped key + master password). Never the plaintext.
+_unlocked_keys = TTLCache(
+    maxsize=settings.VAULT_KEY_CACHE_SIZE,
+    ttl=settings.VAULT_KEY_CACHE_TTL_SECONDS,
+)
+
+def _key_cache_id(wrapped_key: str, master_password: str) -> bytes:
+    msg = wrapped_key.encode('utf-8') + b"\0" + master_password.encode('utf-8')
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), msg, hashlib.sha256).digest()
+
+async def unlock_vault_key(db: AsyncSession, user: User, master_password: str, create: bool = False) -> Optional[bytes]:
+    """
+    Returns the user's data key, unwrapped with the master password.
+    If the user has no data key yet and `create` is set, one is generated and
+    wrapped with this master password, once the password has been checked
+    against the vault's legacy entries. Returns None if the password is wrong.
+
+    Creating the key re-encrypts every legacy entry in the same commit, so a
+    vault with a data key never needs the PBKDF2 fallback again.
+    """
+    if user.vault_key_wrapped is None:
+        if not create:
+            return None
+        # A key wrapped with a mistyped password would lock the legacy entries out for good
+        if not await _legacy_password_ok(db, user.id, master_password):
+            return None
+        data_key = generate_data_key()
+        await _reencrypt_legacy_entries(db, user.id, master_password, data_key)
+        user.vault_key_wrapped = await kdf_executor.run_async(wrap_data_key, master_password, data_key)
+        db.add(user)
+        await db.commit()
+        _unlocked_keys.set(_key_cache_id(user.vault_key_wrapped, master_password), data_key)
+        return data_key
+
+    cache_id = _key_cache_id(user.vault_key_wrapped, master_password)
+    data_key = _unlocked_keys.get(cache_id)
+    if data_key is not None:
+        return data_key
+
+    try:
+        data_key = await kdf_executor.run_async(unwrap_data_key, master_password, user.vault_key_wrapped)
+    except ValueError:
+        return None
+    _unlocked_keys.set(cache_id, data_key)
+    return data_key
+
+async def _legacy_password_ok(db: AsyncSession, user_id: int, master_password: str) -> bool:
+    """
+    For a vault without a data key: decrypts its first legacy entry (one
+    without the envelope marker) with the password. True if that works, or
+    if there is no legacy entry to check against.
+    """
+    result = await db.stream_scalars(select(VaultEntry.encrypted_password).filter(
+        VaultEntry.user_id == user_id
+    ).order_by(VaultEntry.id).execution_options(yield_per=100))
+    async for encrypted_data in result:
+        if not has_envelope_marker(encrypted_data):
+            break
+    else:
+        return True
+    await result.close()
+    try:
+        await kdf_executor.run_async(decrypt_entry, encrypted_data, None, master_password)
+    except ServiceOverloaded:
+        raise
+    except Exception:
+        return False
+    return True
+
+async def _reencrypt_legacy_entries(db: AsyncSession, user_id: int, master_password: str, data_key: bytes) -> None:
+    """
+    Moves a vault without a data key onto `data_key`, VAULT_UPGRADE_BATCH_SIZE
+    entries at a time. Nothing is flushed: the caller's commit writes the new
+    blobs together with the wrapped key. Entries the master password does not
+    decrypt are left as they are.
+    """
+    def _decrypt(encrypted_data: str) -> Optional[str]:
+        try:
+            return decrypt_entry(encrypted_data, None, master_password)[0]
+        except Exception:
+            return None
+
+    last_id = 0
+    while True:
+        result = await db.execute(select(VaultEntry).filter(
+            VaultEntry.user_id == user_id,
+            VaultEntry.id > last_id
+        ).order_by(VaultEntry.id).limit(settings.VAULT_UPGRADE_BATCH_SIZE))
+        rows = result.scalars().all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        plaintexts = await kdf_executor.map_async(_decrypt, [row.encrypted_password for row in rows])
+        for row, plaintext in zip(rows, plaintexts):
+            if plaintext is not None:
+                row.encrypted_password = encrypt_with_data_key(data_key, plaintext)
+
+async def check_master_password(db: AsyncSession, user_id: int, master_password: str) -> bool:
+    """
+    Checks the master password with one KDF run, before any entry is decrypted:
+    by unwrapping the data key or, for a vault holding only legacy blobs, by
+    decrypting its first legacy entry. An empty vault accepts any password.
+    """
+    user = await db.get(User, user_id)
+    if user.vault_key_wrapped is not None:
+        return await unlock_vault_key(db, user, master_password) is not None
+    return await _legacy_password_ok(db, user_id, master_password)
+
+async def create_vault_entry(db: AsyncSession, entry: VaultEntryCreate, user_id: int) -> VaultEntry:
     if entry.encrypted_password:
         encrypted_data = entry.encrypted_password
     elif entry.site_password and entry.master_password:
-        encrypted_data = encrypt_password(entry.master_password, entry.site_password)
+        user = await db.get(User, user_id)
+        data_key = await unlock_vault_key(db, user, entry.master_password, create=True)
+        if data_key is None:
+            raise ValueError("Master password does not match this vault")
+        encrypted_data = encrypt_with_data_key(data_key, entry.site_password)
     else:
         raise ValueError("Either encrypted_password OR (site_password + master_password) must be provided")
 
@@ -18,25 +149,93 @@ def create_vault_entry(db: Session, entry: VaultEntryCreate, user_id: int) -> Va
         user_id=user_id
     )
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    await db.commit()
+    await db.refresh(db_entry)
     return db_entry
 
-def get_vault_entry(db: Session, entry_id: int, master_password: str, user_id: int) -> dict:
-    db_entry = db.query(VaultEntry).filter(
+async def get_vault_entry(db: AsyncSession, entry_id: int, master_password: str, user_id: int) -> dict:
+    result = await db.execute(select(VaultEntry).filter(
         VaultEntry.id == entry_id,
         VaultEntry.user_id == user_id
-    ).first()
-    
+    ))
+    db_entry = result.scalars().first()
+
     if not db_entry:
         return None
-    
-    # Decrypt
+
+    user = await db.get(User, user_id)
+    # A legacy vault gets its data key (and its entries re-encrypted) on first reveal
+    data_key = await unlock_vault_key(db, user, master_password, create=True)
+    if data_key is None:
+        return None  # wrong master password
+
     try:
-        decrypted_pwd = decrypt_password(master_password, db_entry.encrypted_password)
-    except Exception:
+        decrypted_pwd = decrypt_with_data_key(data_key, db_entry.encrypted_password)
+    except ValueError:
         return None
 
+    return _decrypted_entry(db_entry, decrypted_pwd)
+
+async def reveal_vault_entries(db: AsyncSession, entry_ids: List[int], master_password: str, user_id: int) -> List[dict]:
+    """
+    Decrypts many entries with one query and one key unlock.
+    Returns one result per requested id, in request order:
+    {"id", "ok", "entry", "error"}.
+    """
+    entry_ids = list(dict.fromkeys(entry_ids))
+    result = await db.execute(select(VaultEntry).filter(
+        VaultEntry.user_id == user_id,
+        VaultEntry.id.in_(entry_ids)
+    ))
+    return await _reveal_rows(db, result.scalars().all(), entry_ids, master_password, user_id)
+
+async def iter_revealed_entries(db: AsyncSession, master_password: str, user_id: int, batch_size: int) -> AsyncIterator[List[dict]]:
+    """
+    Same as reveal_vault_entries, for every entry the user owns, yielded in
+    id order `batch_size` entries at a time. Rows are paged by id and dropped
+    from the session after each batch, so only one batch is held in memory.
+    """
+    last_id = 0
+    while True:
+        result = await db.execute(select(VaultEntry).filter(
+            VaultEntry.user_id == user_id,
+            VaultEntry.id > last_id
+        ).order_by(VaultEntry.id).limit(batch_size))
+        rows = result.scalars().all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        results = await _reveal_rows(db, rows, [row.id for row in rows], master_password, user_id)
+        db.expunge_all()
+        yield results
+
+async def _reveal_rows(db: AsyncSession, rows: List[VaultEntry], entry_ids: List[int], master_password: str, user_id: int) -> List[dict]:
+    by_id = {row.id: row for row in rows}
+
+    user = await db.get(User, user_id)
+    data_key = await unlock_vault_key(db, user, master_password, create=True)
+    if data_key is None:
+        # Wrong master password: fail every entry without decrypting any of them
+        return [
+            {"id": entry_id, "ok": False, "error": "Invalid master password" if entry_id in by_id else "Entry not found"}
+            for entry_id in entry_ids
+        ]
+
+    # Only AES-GCM from here: with a data key there is no per-entry PBKDF2 fallback
+    results = []
+    for entry_id in entry_ids:
+        if entry_id not in by_id:
+            results.append({"id": entry_id, "ok": False, "error": "Entry not found"})
+            continue
+        try:
+            decrypted_pwd = decrypt_with_data_key(data_key, by_id[entry_id].encrypted_password)
+        except ValueError:
+            results.append({"id": entry_id, "ok": False, "error": "Decryption failed"})
+            continue
+        results.append({"id": entry_id, "ok": True, "entry": _decrypted_entry(by_id[entry_id], decrypted_pwd)})
+    return results
+
+def _decrypted_entry(db_entry: VaultEntry, decrypted_pwd: str) -> dict:
     return {
         "id": db_entry.id,
         "site_name": db_entry.site_name,
@@ -45,7 +244,131 @@ def get_vault_entry(db: Session, entry_id: int, master_password: str, user_id: i
         "decrypted_password": decrypted_pwd
     }
 
-def list_vault_entries(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(VaultEntry).filter(
+async def list_vault_entries(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(VaultEntry).filter(
         VaultEntry.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    ).offset(skip).limit(limit))
+    return result.scalars().all()
+
+# Keyset pagination. Columns a listing may be ordered by; id breaks ties.
+PAGE_ORDERS = {"id": VaultEntry.id, "updated_at": VaultEntry.updated_at}
+
+def _encode_cursor(order_by: str, descending: bool, row: VaultEntry) -> str:
+    value = getattr(row, order_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"o": order_by, "d": descending, "k": [value, row.id]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor: str) -> Tuple[str, bool, list]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        order_by, descending, (value, entry_id) = payload["o"], bool(payload["d"]), payload["k"]
+        if order_by not in PAGE_ORDERS:
+            raise ValueError(order_by)
+        if order_by == "updated_at" and value is not None:
+            value = datetime.fromisoformat(value)
+        return order_by, descending, [value, int(entry_id)]
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+async def list_vault_entries_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    after: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+) -> Tuple[List[VaultEntry], Optional[str]]:
+    """
+    Cursor-based listing: seeks past the last row of the previous page using
+    the (user_id, <order>, id) index instead of an OFFSET scan, so every page
+    costs the same. Returns (rows, next_cursor); next_cursor is None on the
+    last page. A cursor carries its own ordering.
+    """
+    if after:
+        order_by, descending, key = _decode_cursor(after)
+    elif order_by not in PAGE_ORDERS:
+        raise ValueError(f"Cannot order by {order_by!r}")
+
+    sort_col = PAGE_ORDERS[order_by]
+    sort_key = (sort_col,) if order_by == "id" else (sort_col, VaultEntry.id)
+    query = select(VaultEntry).filter(VaultEntry.user_id == user_id)
+
+    if after:
+        values = key[1:] if order_by == "id" else key
+        bound = tuple_(*sort_key) < tuple_(*values) if descending else tuple_(*sort_key) > tuple_(*values)
+        query = query.filter(bound)
+
+    query = query.order_by(*(col.desc() if descending else col.asc() for col in sort_key))
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor(order_by, descending, rows[-1])
+
+# Search. Trigrams need at least 3 characters; shorter queries use a prefix LIKE.
+SEARCH_MIN_TRIGRAM = 3
+
+_fts_available: Optional[bool] = None
+
+async def _has_search_index(db: AsyncSession) -> bool:
+    global _fts_available
+    if _fts_available is None:
+        if db.get_bind().dialect.name != "sqlite":
+            _fts_available = False
+        else:
+            result = await db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            )
+            _fts_available = result.first() is not None
+    return _fts_available
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def search_vault_entries(db: AsyncSession, user_id: int, q: str, limit: int = 20) -> List[VaultEntry]:
+    """
+    Finds the user's entries whose site name or URL contains `q` (case-insensitive).
+    Entries whose site name starts with `q` rank first, then by FTS5 bm25 with
+    site_name weighted above site_url.
+    """
+    q = q.strip()
+    if not q:
+        return []
+    prefix = _like_escape(q) + "%"
+
+    if len(q) >= SEARCH_MIN_TRIGRAM and await _has_search_index(db):
+        # A quoted FTS5 string is a substring match under the trigram tokenizer.
+        # The owner phrase limits the match to this user's rows inside the index.
+        match = f'owner : "{owner_token(user_id)}" AND {{site_name site_url}} : "' + q.replace('"', '""') + '"'
+        query = select(VaultEntry).from_statement(text(f"""
+            SELECT vault_entries.* FROM {FTS_TABLE}
+            JOIN vault_entries ON vault_entries.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match AND vault_entries.user_id = :user_id
+            ORDER BY vault_entries.site_name LIKE :prefix ESCAPE '\\' DESC,
+                     bm25({FTS_TABLE}, 10.0, 1.0, 0.0), vault_entries.id
+            LIMIT :limit
+        """).bindparams(match=match, user_id=user_id, prefix=prefix, limit=limit))
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    if len(q) >= SEARCH_MIN_TRIGRAM:
+        pattern = "%" + _like_escape(q) + "%"
+        condition = or_(
+            VaultEntry.site_name.ilike(pattern, escape="\\"),
+            VaultEntry.site_url.ilike(pattern, escape="\\"),
+        )
+    else:
+        # Too short for trigrams: prefix of the name, the URL, or the URL's host
+        condition = or_(
+            VaultEntry.site_name.ilike(prefix, escape="\\"),
+            VaultEntry.site_url.ilike(prefix, escape="\\"),
+            VaultEntry.site_url.ilike("%://" + prefix, escape="\\"),
+        )
+    result = await db.execute(select(VaultEntry).filter(
+        VaultEntry.user_id == user_id, condition
+    ).order_by(VaultEntry.site_name, VaultEntry.id).limit(limit))
+    return result.scalars().all()
@@ -0,0 +1,189 @@
+"""
+Microbenchmarks for the crypto, hashing, strength and generator hot paths.
+
+    python benchmarks/bench.py                     # run and print ops/sec, p50, p99
+    python benchmarks/bench.py --save              # also write benchmarks/baseline.json
+    python benchmarks/bench.py --compare           # fail (exit 1) on regressions vs the baseline
+    python benchmarks/bench.py -k strength --seconds 2
+
+Runs offline; no server, database or network access is needed. Baselines are
+machine specific: save one before a change and compare after it, on the same box.
+"""
+import argparse
+import json
+import os
+import platform
+import secrets
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from jose import jwt
+
+from app.core import crypto, security
+from app.core.config import settings
+from app.services import generator_service, health_service
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def _benchmarks() -> Dict[str, Callable[[], Callable[[], object]]]:
+    """name -> setup; setup returns the zero-argument operation to time."""
+
+    def derive_key():
+        salt = os.urandom(crypto.SALT_SIZE)
+        return lambda: crypto.derive_key("master-password", salt)
+
+    def encrypt_password():
+        return lambda: crypto.encrypt_password("master-password", "site-password")
+
+    def decrypt_password():
+        blob = crypto.encrypt_password("master-password", "site-password")
+        return lambda: crypto.decrypt_password("master-password", blob)
+
+    def envelope_encrypt():
+        key = crypto.generate_data_key()
+        return lambda: crypto.encrypt_with_data_key(key, "site-password")
+
+    def envelope_decrypt():
+        key = crypto.generate_data_key()
+        blob = crypto.encrypt_with_data_key(key, "site-password")
+        return lambda: crypto.decrypt_with_data_key(key, blob)
+
+    def get_password_hash():
+        return lambda: security.get_password_hash("Tr0ub4dor&3horse")
+
+    def verify_password():
+        hashed = security.get_password_hash("Tr0ub4dor&3horse")
+        return lambda: security.verify_password("Tr0ub4dor&3horse", hashed)
+
+    def strength(length: int):
+        def setup():
+            # Unique inputs so the strength cache never answers
+            base = ("correct horse battery staple " * 8)[:max(length - 8, 0)]
+            return lambda: health_service.check_password_strength(base + secrets.token_hex(4))
+        return setup
+
+    def generate_strong_password():
+        return lambda: generator_service.generate_strong_password(16)
+
+    def generate_passwords_batch_100():
+        return lambda: generator_service.generate_passwords(100, 16)
+
+    def jwt_encode_decode():
+        def op():
+            token = security.create_access_token({"sub": "bench@example.com", "uid": 1})
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        return op
+
+    benchmarks = {
+        "crypto.derive_key": derive_key,
+        "crypto.encrypt_password": encrypt_password,
+        "crypto.decrypt_password": decrypt_password,
+        "crypto.encrypt_with_data_key": envelope_encrypt,
+        "crypto.decrypt_with_data_key": envelope_decrypt,
+        "security.get_password_hash": get_password_hash,
+        "security.verify_password": verify_password,
+    }
+    for length in (8, 16, 32, 64, 100, 200):
+        benchmarks[f"health.check_password_strength[{length}]"] = strength(length)
+    benchmarks.update({
+        "generator.generate_strong_password": generate_strong_password,
+        "generator.generate_passwords[100]": generate_passwords_batch_100,
+        "jwt.encode_decode": jwt_encode_decode,
+    })
+    return benchmarks
+
+def measure(op: Callable[[], object], seconds: float, min_runs: int = 5) -> dict:
+    op()  # warm-up
+    samples: List[int] = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < min_runs or time.perf_counter() < deadline:
+        started = time.perf_counter_ns()
+        op()
+        samples.append(time.perf_counter_ns() - started)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "runs": len(samples),
+        "ops_per_sec": round(len(samples) / (total / 1e9), 2),
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[min(int(len(samples) * 0.99), len(samples) - 1)] / 1000, 2),
+        "stdev_us": round(statistics.pstdev(samples) / 1000, 2),
+    }
+
+def run(selected: List[str], seconds: float) -> Dict[str, dict]:
+    benchmarks = _benchmarks()
+    results = {}
+    for name in selected:
+        results[name] = measure(benchmarks[name](), seconds)
+        r = results[name]
+        print(f"{name:45} {r['ops_per_sec']:>12,.1f} ops/s  p50 {r['p50_us']:>11,.1f} us  p99 {r['p99_us']:>11,.1f} us")
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Returns the benchmarks whose throughput dropped by more than `threshold` (0.2 = 20%)."""
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ops_per_sec"]
+        change = current["ops_per_sec"] / before - 1 if before else 0.0
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:45} {before:>12,.1f} {current['ops_per_sec']:>12,.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per benchmark (default 1)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON path")
+    parser.add_argument("--save", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed throughput drop (default 0.2)")
+    args = parser.parse_args(argv)
+
+    selected = [name for name in _benchmarks() if not args.filter or args.filter in name]
+    if not selected:
+        parser.error(f"no benchmark matches {args.filter!r}")
+
+    results = run(selected, args.seconds)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions.")
+
+    if args.save:
+        # Merge so a filtered run only replaces the benchmarks it ran
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f).get("results", {})
+        saved.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+                "settings": {
+                    "pbkdf2_iterations": crypto.ITERATIONS,
+                    "argon2": [settings.ARGON2_MEMORY_COST_KIB, settings.ARGON2_TIME_COST, settings.ARGON2_PARALLELISM],
+                    "strength_max_length": settings.STRENGTH_MAX_LENGTH,
+                },
+                "results": saved,
+            }, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app.
+
+    python benchmarks/import_time.py                  # median of 5 runs + slowest modules
+    python benchmarks/import_time.py --runs 10 --top 25
+    python benchmarks/import_time.py --max-seconds 1  # exit 1 if the median is slower
+
+Each run is a new `python -c "import app.main"` process, so it measures what
+a freshly started or autoscaled worker pays before it can serve. One extra
+run with `-X importtime` (which slows imports down) gives the module breakdown.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(module: str, *flags: str) -> Tuple[float, str]:
+    env = {**os.environ, "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark")}
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *flags, "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return time.perf_counter() - started, proc.stderr
+
+def _module_times(module: str) -> Dict[str, int]:
+    """Self time in microseconds per imported module."""
+    _, stderr = _run(module, "-X", "importtime")
+    # "import time: <self us> | <cumulative us> | <indented module>"
+    self_us = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_part, _, name = line[len("import time:"):].split("|")
+        self_us[name.strip()] = int(self_part)
+    return self_us
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to import (default app.main)")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters (default 5)")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list (default 15)")
+    parser.add_argument("--max-seconds", type=float, help="fail if the median wall time exceeds this")
+    args = parser.parse_args(argv)
+
+    _run(args.module)  # warm the OS page cache and __pycache__
+    wall: List[float] = [_run(args.module)[0] for _ in range(args.runs)]
+
+    median = statistics.median(wall)
+    print(f"import {args.module}: median {median * 1000:.0f} ms, min {min(wall) * 1000:.0f} ms, "
+          f"max {max(wall) * 1000:.0f} ms over {args.runs} runs (wall time incl. interpreter start)")
+    print(f"\n{'module':60} {'self ms':>8}")
+    slowest = sorted(_module_times(args.module).items(), key=lambda item: item[1], reverse=True)
+    for name, us in slowest[:args.top]:
+        print(f"{name:60} {us / 1000:>8.1f}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"\nMedian import time {median:.3f}s exceeds {args.max_seconds}s")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
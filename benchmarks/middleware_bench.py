@@ -0,0 +1,109 @@
+"""
+Requests/sec through the response middleware, driving the ASGI app directly
+(no sockets), so only framework and middleware overhead is measured.
+
+    python benchmarks/middleware_bench.py
+    python benchmarks/middleware_bench.py --seconds 3 --entries 500
+
+Variants: no middleware, the previous @app.middleware("http") security
+headers, the pure ASGI SecurityHeadersMiddleware, and the latter plus
+CompressionMiddleware for a gzip-accepting client. Each serves a small JSON
+body and a GET /vault/-sized list of `--entries` entries.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import FastAPI
+
+from app.core.middleware import CompressionMiddleware, SecurityHeadersMiddleware
+
+def _app(variant: str, entries: int) -> FastAPI:
+    app = FastAPI()
+    rows = [
+        {"id": i, "site_name": f"site-{i}", "site_url": f"https://site-{i}.example.com",
+         "encrypted_password": os.urandom(48).hex(), "created_at": "2025-01-01T00:00:00"}
+        for i in range(entries)
+    ]
+
+    @app.get("/small")
+    def small():
+        return {"message": "ok"}
+
+    @app.get("/large")
+    def large():
+        return rows
+
+    if variant == "http-middleware":
+        @app.middleware("http")
+        async def add_security_headers(request, call_next):
+            response = await call_next(request)
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-XSS-Protection"] = "1; mode=block"
+            response.headers["Content-Security-Policy"] = (
+                "default-src 'self'; "
+                "script-src 'self' 'unsafe-inline'; "
+                "style-src 'self' 'unsafe-inline'; "
+                "img-src 'self' data:;"
+            )
+            response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+            return response
+    elif variant != "none":
+        app.add_middleware(SecurityHeadersMiddleware)
+        if variant == "asgi+compression":
+            app.add_middleware(CompressionMiddleware)
+    return app
+
+async def _request(app, path: str, accept_encoding: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", accept_encoding)],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    sent = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return sent
+
+async def _measure(app, path: str, seconds: float) -> tuple:
+    accept = b"gzip, br"
+    size = await _request(app, path, accept)  # warm-up (also builds the middleware stack)
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        await _request(app, path, accept)
+        count += 1
+    return count / (time.perf_counter() - started), size
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per measurement (default 1)")
+    parser.add_argument("--entries", type=int, default=200, help="entries in the large response (default 200)")
+    args = parser.parse_args(argv)
+
+    print(f"{'variant':20} {'path':8} {'req/s':>10} {'bytes out':>10}")
+    for variant in ("none", "http-middleware", "asgi", "asgi+compression"):
+        app = _app(variant, args.entries)
+        for path in ("/small", "/large"):
+            rate, size = asyncio.run(_measure(app, path, args.seconds))
+            print(f"{variant:20} {path:8} {rate:>10,.0f} {size:>10,}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
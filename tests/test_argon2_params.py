@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+import secrets
+import tempfile
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.core import calibrate_argon2, security
+from app.core.limiter import limiter
+from app.db.session import AsyncSessionLocal, async_engine, async_read_engine, engine, Base
+from app.db.models import User
+from app.main import app
+
+async def _stored_hash(email: str) -> str:
+    from sqlalchemy import select
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.hashed_password).filter(User.email == email))
+        stored = result.scalar_one()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    return stored
+
+def test_rehash_on_login():
+    print("\n[TEST] Argon2 Rehash on Login...")
+    Base.metadata.create_all(bind=engine)
+    previous = security.pwd_context, limiter.enabled
+    limiter.enabled = False
+    client = TestClient(app)
+    email = f"argon-{secrets.token_hex(4)}@test.com"
+    password = "Correct-Horse-Battery-9"
+    try:
+        security.pwd_context = security.build_pwd_context(8192, 1, 1)
+        assert client.post("/api/v1/auth/register", json={"email": email, "password": password}).status_code == 200
+        assert "m=8192,t=1,p=1" in asyncio.run(_stored_hash(email))
+
+        # 1. New parameters: verify_and_update reports a replacement hash
+        security.pwd_context = security.build_pwd_context(9216, 2, 1)
+        old = asyncio.run(_stored_hash(email))
+        assert security.verify_and_update("wrong", old) == (False, None)
+        verified, new_hash = security.verify_and_update(password, old)
+        assert verified and "m=9216,t=2,p=1" in new_hash
+        assert security.verify_and_update(password, new_hash) == (True, None)
+        print("  [PASS] Outdated hash detected and replaced.")
+
+        # 2. A successful login stores the upgraded hash
+        assert client.post("/api/v1/auth/login", data={"username": email, "password": password}).status_code == 200
+        assert "m=9216,t=2,p=1" in asyncio.run(_stored_hash(email))
+        assert client.post("/api/v1/auth/login", data={"username": email, "password": password}).status_code == 200
+        print("  [PASS] Login rehashed the stored password transparently.")
+    finally:
+        security.pwd_context, limiter.enabled = previous
+
+def test_calibration():
+    print("\n[TEST] Argon2 Calibration...")
+    # An unreachable target falls back to the OWASP minimum
+    result = calibrate_argon2.calibrate(target_ms=0.001, memory_budget_kib=64 * 1024, samples=1)
+    assert result["ARGON2_MEMORY_COST_KIB"] == calibrate_argon2.MIN_MEMORY_KIB
+    assert result["ARGON2_TIME_COST"] == 1
+    print("  [PASS] Memory halved down to the floor when over the latency target.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, ".env")
+        with open(path, "w") as f:
+            f.write("SECRET_KEY=abc\nARGON2_TIME_COST=9\n")
+        calibrate_argon2.write_env(path, {"ARGON2_TIME_COST": 2, "ARGON2_MEMORY_COST_KIB": 19456})
+        with open(path) as f:
+            assert f.read().splitlines() == ["SECRET_KEY=abc", "ARGON2_TIME_COST=2", "ARGON2_MEMORY_COST_KIB=19456"]
+    print("  [PASS] Settings written to the env file.")
+
+if __name__ == "__main__":
+    test_rehash_on_login()
+    test_calibration()
@@ -0,0 +1,139 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.executor import AdmissionRejected, CPUExecutor, MemoryBudget, ServiceOverloaded
+
+def test_executor_backpressure():
+    print("\n[TEST] KDF Executor Backpressure...")
+    executor = CPUExecutor("test", max_workers=1, max_queue=1)
+    gate = threading.Event()
+
+    # 1. One running + one queued fills the executor
+    running = executor.submit(gate.wait)
+    queued = executor.submit(lambda: 42)
+    try:
+        executor.submit(lambda: 0)
+        assert False, "Submit should have been rejected"
+    except ServiceOverloaded as e:
+        assert e.retry_after == 1
+    print("  [PASS] Full executor rejects fast.")
+
+    # 2. Slots are released once work drains
+    gate.set()
+    running.result()
+    assert queued.result() == 42
+    assert executor.run(lambda: "ok") == "ok"
+
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 3
+    assert stats["queued"] == 0 and stats["running"] == 0
+    print(f"  Stats: {stats}")
+    print("  [PASS] Executor drains and reports stats.")
+
+def test_executor_map():
+    print("\n[TEST] KDF Executor Map...")
+    executor = CPUExecutor("test", max_workers=3, max_queue=0)
+    assert executor.map(lambda x: x * 2, range(10)) == [x * 2 for x in range(10)]
+    print("  [PASS] Map preserves order with chunked tasks.")
+
+def test_memory_budget():
+    print("\n[TEST] Memory Budget Admission...")
+    asyncio.run(_memory_budget_flow())
+
+async def _memory_budget_flow():
+    budget = MemoryBudget("test", budget_bytes=100, timeout=0.05)
+    held = asyncio.Event()
+    release = asyncio.Event()
+
+    async def hold():
+        async with budget.admit(60):
+            held.set()
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await held.wait()
+
+    # 1. Work that fits is admitted alongside; work that does not is shed at the deadline
+    async with budget.admit(40):
+        assert budget.stats()["in_use_bytes"] == 100
+    try:
+        async with budget.admit(50):
+            assert False, "Admission should have timed out"
+    except AdmissionRejected as e:
+        assert isinstance(e, ServiceOverloaded)
+    print("  [PASS] Over-budget work shed after the deadline.")
+
+    # 2. Queued work is admitted as soon as memory is released
+    budget.timeout = 5
+    asyncio.get_running_loop().call_later(0.05, release.set)
+    started = time.monotonic()
+    async with budget.admit(50):
+        assert budget.stats()["admitted"] == 1
+    assert time.monotonic() - started < 1
+    await holder
+
+    stats = budget.stats()
+    assert stats["admitted_total"] == 3 and stats["shed_total"] == 1
+    assert stats["queued"] == 0 and stats["in_use_bytes"] == 0
+    print(f"  Stats: {stats}")
+    print("  [PASS] Waiting work admitted on release.")
+
+def test_memory_budget_contended():
+    print("\n[TEST] Memory Budget Under Contention...")
+    asyncio.run(_contended_flow())
+
+async def _contended_flow():
+    # Room for one hash at a time on a two-thread pool
+    executor = CPUExecutor("contended", max_workers=2, max_queue=16)
+    budget = MemoryBudget("test", budget_bytes=100, timeout=5)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def fake_hash():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def hash_one():
+        async with budget.admit(60):
+            await executor.run_async(fake_hash)
+
+    hashes = [asyncio.create_task(hash_one()) for _ in range(6)]
+    await asyncio.sleep(0.01)
+
+    # 1. Waiting hashes queue on the event loop, not in the pool
+    assert budget.stats()["queued"] == 5
+    assert executor.stats()["running"] + executor.stats()["queued"] == 1
+    started = time.monotonic()
+    assert await executor.run_async(lambda: "free") == "free"
+    assert time.monotonic() - started < 0.04
+    print("  [PASS] Pool thread free for other work while hashes wait for memory.")
+
+    # 2. All hashes complete, one at a time
+    await asyncio.gather(*hashes)
+    assert peak[0] == 1
+    assert budget.stats()["admitted_total"] == 6 and budget.stats()["in_use_bytes"] == 0
+    print("  [PASS] Contended hashes admitted in turn within the budget.")
+
+    # 3. The default budget binds: fewer concurrent hashes than KDF workers
+    from app.core.config import settings
+    from app.core.executor import _default_hash_memory_budget_bytes
+    per_hash = settings.ARGON2_MEMORY_COST_KIB * 1024
+    assert _default_hash_memory_budget_bytes() // per_hash == max(1, settings.KDF_EXECUTOR_WORKERS // 2)
+    print("  [PASS] Default budget admits half the KDF workers.")
+
+if __name__ == "__main__":
+    test_executor_backpressure()
+    test_executor_map()
+    test_memory_budget()
+    test_memory_budget_contended()
+    print("\n[ALL TESTS PASSED] Executor Verified.")
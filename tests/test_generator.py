@@ -1,5 +1,6 @@
 import sys
 import os
+import math
 import secrets
 # Add project root to path
 sys.path.append(os.getcwd())
@@ -34,6 +35,29 @@ def test_generator():
     
     print("  [PASS] Complexity requirements met.")
 
+    # Test 3: Batch generation honours classes for every result
+    batch = generator_service.generate_passwords(500, length=8, include_symbols=False)
+    assert len(batch) == 500 and len(set(batch)) == 500
+    assert all(any(c.isupper() for c in p) and any(c.isdigit() for c in p) for p in batch)
+    assert not any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for p in batch for c in p)
+    print("  [PASS] Batch generation.")
+
+    # Test 4: Entropy of the constrained space (lowercase only: exactly 8 * log2(26))
+    assert generator_service.password_entropy_bits(8, False, False, False) == round(8 * 4.70044, 2)
+    assert generator_service.password_entropy_bits(16) < 16 * 6.46
+    # Uppercase required, lowercase not: every 8-char string over 52 letters minus the all-lowercase ones
+    assert generator_service.password_entropy_bits(8, True, False, False) == round(math.log2(52 ** 8 - 26 ** 8), 2)
+    print("  [PASS] Entropy reported.")
+
+    # Test 5: Diceware passphrases
+    phrases = generator_service.generate_passphrases(20, words=5, separator=" ")
+    wordlist = generator_service.get_wordlist()
+    assert len(wordlist) == 7776
+    known = {wordlist[i] for i in range(len(wordlist))}
+    assert all(len(p.split(" ")) == 5 and set(p.split(" ")) <= known for p in phrases)
+    assert generator_service.passphrase_entropy_bits(5) == 64.62
+    print("  [PASS] Passphrases from the EFF wordlist.")
+
 if __name__ == "__main__":
     test_generator()
     print("\n[ALL TESTS PASSED] Generator Verified.")
@@ -5,11 +5,24 @@ import asyncio
 # Add project root to path
 sys.path.append(os.getcwd())
 
-from app.core.crypto import encrypt_password, decrypt_password, derive_key
+from app.core.crypto import (
+    encrypt_password, decrypt_password, derive_key,
+    generate_data_key, wrap_data_key, unwrap_data_key,
+    encrypt_with_data_key, decrypt_entry, LEGACY_VERSION, ENVELOPE_VERSION,
+)
 from app.services import health_service, pwned_service
-from app.db.session import SessionLocal, engine, Base
+import json
+import secrets
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core import security
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.db.session import AsyncSessionLocal, async_engine, engine, Base
+from app.main import app
 from app.schemas.vault import VaultEntryCreate
-from app.services import vault_service
+from app.db.models import User, VaultEntry
+from app.services import audit_service, vault_service
 
 def test_crypto():
     print("\n[TEST] Testing Core Crypto...")
@@ -33,6 +46,30 @@ def test_crypto():
     except Exception:
         print("  [PASS] Failed to decrypt with wrong password (Expected).")
 
+def test_envelope_crypto():
+    print("\n[TEST] Testing Envelope Crypto...")
+    master = "secure-master-password"
+    data_key = generate_data_key()
+
+    # 1. Wrap / unwrap the data key
+    wrapped = wrap_data_key(master, data_key)
+    assert unwrap_data_key(master, wrapped) == data_key
+    try:
+        unwrap_data_key("wrong-password", wrapped)
+        assert False, "Unwrapped with wrong password?!"
+    except ValueError:
+        pass
+    print("  [PASS] Data key wrap/unwrap.")
+
+    # 2. Entries encrypted with the data key
+    blob = encrypt_with_data_key(data_key, "my-secret-data")
+    assert decrypt_entry(blob, data_key) == ("my-secret-data", ENVELOPE_VERSION)
+
+    # 3. Legacy blobs still decrypt through the version dispatch
+    legacy = encrypt_password(master, "old-secret")
+    assert decrypt_entry(legacy, data_key, master) == ("old-secret", LEGACY_VERSION)
+    print("  [PASS] Envelope and legacy blobs decrypt.")
+
 def test_health():
     print("\n[TEST] Testing Health Service...")
     res = health_service.check_password_strength("correct horse battery staple")
@@ -53,9 +90,15 @@ def test_vault_db():
     # Reset DB
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-    
-    db = SessionLocal()
-    try:
+    asyncio.run(_vault_db_flow())
+
+async def _vault_db_flow():
+    async with AsyncSessionLocal() as db:
+        user = User(email="vault@test.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+
         entry = VaultEntryCreate(
             site_name="Test Bank",
             site_url="https://bank.com",
@@ -64,7 +107,7 @@ def test_vault_db():
         )
         
         # Create
-        db_entry = vault_service.create_vault_entry(db, entry)
+        db_entry = await vault_service.create_vault_entry(db, entry, user.id)
         print(f"  Created entry ID: {db_entry.id}")
         
         # Verify ZK (Check raw DB data)
@@ -73,19 +116,207 @@ def test_vault_db():
         print("  [PASS] Plaintext not found in DB object.")
         
         # Retrieve
-        decrypted = vault_service.get_vault_entry(db, db_entry.id, "my-master-key")
+        decrypted = await vault_service.get_vault_entry(db, db_entry.id, "my-master-key", user.id)
         assert decrypted["decrypted_password"] == "super-secret-bank-password"
         print("  [PASS] Decryption via Service success.")
-        
+
+        # Wrong master password
+        assert await vault_service.get_vault_entry(db, db_entry.id, "wrong-key", user.id) is None
+        print("  [PASS] Wrong master password rejected.")
+
+        # With a data key, a blob it does not authenticate fails without a PBKDF2 fallback
+        from app.core import crypto
+        derivations = []
+        original_derive_key = crypto.derive_key
+        crypto.derive_key = lambda *args: derivations.append(args) or original_derive_key(*args)
+        try:
+            db_entry.encrypted_password = encrypt_password("my-master-key", "legacy-password")
+            await db.commit()
+            derivations.clear()
+            assert await vault_service.get_vault_entry(db, db_entry.id, "my-master-key", user.id) is None
+            results = await vault_service.reveal_vault_entries(db, [db_entry.id] * 3, "my-master-key", user.id)
+            assert [result["error"] for result in results] == ["Decryption failed"]
+            assert derivations == []
+            print("  [PASS] No legacy fallback once the vault has a data key.")
+
+            data_key = unwrap_data_key("my-master-key", user.vault_key_wrapped)
+            db_entry.encrypted_password = encrypt_with_data_key(data_key, "rotated-password")
+            await db.commit()
+
+            # Batch reveal: one query, per-entry results in request order
+            results = await vault_service.reveal_vault_entries(db, [db_entry.id, 9999], "my-master-key", user.id)
+            assert results[0]["ok"] and results[0]["entry"]["decrypted_password"] == "rotated-password"
+            assert not results[1]["ok"] and results[1]["error"] == "Entry not found"
+            print("  [PASS] Batch reveal.")
+
+            # A wrong master password fails at the key unwrap, not with a KDF run per entry
+            derivations.clear()
+            results = await vault_service.reveal_vault_entries(db, [db_entry.id, db_entry.id + 1], "wrong-key", user.id)
+        finally:
+            crypto.derive_key = original_derive_key
+        assert [result["error"] for result in results] == ["Invalid master password", "Entry not found"]
+        assert len(derivations) == 1
+        print("  [PASS] Wrong master password rejected once for the whole batch.")
+
+        # The audit checks the master password once, up front
+        assert await vault_service.check_master_password(db, user.id, "my-master-key")
+        assert not await vault_service.check_master_password(db, user.id, "wrong-key")
+        print("  [PASS] Master password checked before decrypting.")
+
+        # A vault with only legacy entries gets its data key from the right password only
+        legacy_user = User(email="legacy@test.com", hashed_password="x")
+        db.add(legacy_user)
+        await db.commit()
+        old_entry = await vault_service.create_vault_entry(db, VaultEntryCreate(
+            site_name="Old Bank", encrypted_password=encrypt_password("real-master", "old-secret")), legacy_user.id)
+        typo = VaultEntryCreate(site_name="New", site_password="new-secret", master_password="reel-master")
+        try:
+            await vault_service.create_vault_entry(db, typo, legacy_user.id)
+            assert False, "Data key created with the wrong master password"
+        except ValueError:
+            pass
+        await db.refresh(legacy_user)
+        assert legacy_user.vault_key_wrapped is None
+        typo.master_password = "real-master"
+        await vault_service.create_vault_entry(db, typo, legacy_user.id)
+        revealed = await vault_service.get_vault_entry(db, old_entry.id, "real-master", legacy_user.id)
+        assert revealed["decrypted_password"] == "old-secret"
+        print("  [PASS] Mistyped password cannot lock legacy entries out.")
+
+        # Creating the data key moved the legacy entry onto it
+        await db.refresh(old_entry)
+        data_key = unwrap_data_key("real-master", legacy_user.vault_key_wrapped)
+        assert decrypt_entry(old_entry.encrypted_password, data_key) == ("old-secret", ENVELOPE_VERSION)
+        print("  [PASS] Legacy entries re-encrypted when the data key is created.")
+
+        # Search: substring via the trigram index, prefix LIKE for short queries
+        for name, url in [("GitHub", "https://github.com"), ("My Git server", "https://git.example.org")]:
+            await vault_service.create_vault_entry(
+                db, VaultEntryCreate(site_name=name, site_url=url, encrypted_password="x"), user.id
+            )
+        found = await vault_service.search_vault_entries(db, user.id, "GIT")
+        assert [e.site_name for e in found] == ["GitHub", "My Git server"]
+        assert [e.site_name for e in await vault_service.search_vault_entries(db, user.id, "bank")] == ["Test Bank"]
+        assert [e.site_name for e in await vault_service.search_vault_entries(db, user.id, "gi")] == ["GitHub", "My Git server"]
+        assert await vault_service.search_vault_entries(db, user.id + 1, "git") == []
+        print("  [PASS] Vault search.")
+
+        # The user filter is part of the FTS MATCH: the index yields only this user's rows
+        other = User(email="other@test.com", hashed_password="x")
+        db.add(other)
+        await db.commit()
+        await vault_service.create_vault_entry(db, VaultEntryCreate(site_name="GitHub", encrypted_password="x"), other.id)
+        statements = []
+        listener = lambda conn, cursor, sql, params, *args: statements.append((sql, params))
+        event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            assert [e.site_name for e in await vault_service.search_vault_entries(db, other.id, "git")] == ["GitHub"]
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+        sql, params = next((sql, params) for sql, params in statements if "MATCH" in sql)
+        conn = await db.connection()
+        plan = [row[3] for row in (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params)).all()]
+        assert any("VIRTUAL TABLE" in step for step in plan), plan
+        assert any(step.startswith("SEARCH vault_entries USING INTEGER PRIMARY KEY") for step in plan), plan
+        assert ["SCAN", "vault_entries"] not in [step.split()[:2] for step in plan], plan
+        match = next(value for value in params if isinstance(value, str) and "owner" in value)
+        matched = (await conn.exec_driver_sql("SELECT rowid FROM vault_entries_fts WHERE vault_entries_fts MATCH ?", (match,))).all()
+        assert len(matched) == 1
+        print(f"  [PASS] FTS MATCH filtered by user: {' | '.join(plan)}")
+
+    # Pooled connections are bound to this event loop
+    await async_engine.dispose()
+
+AUDIT_PASSWORDS = ["hunter2", "Vq8#xLm2!pZr7@Tw", "hunter2", "letmein", "hunter2"]
+
+async def _fake_pwned(lookups, password):
+    lookups.append(password)
+    return 1000 if password in ("hunter2", "letmein") else 0
+
+async def _seed_audit_user():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"audit-{secrets.token_hex(4)}@test.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        # Written before the data key exists, so it is moved onto it with the first entry
+        db.add(VaultEntry(user_id=user.id, site_name="legacy", encrypted_password=encrypt_password("audit-master", "letmein")))
+        await db.commit()
+        for i, password in enumerate(AUDIT_PASSWORDS):
+            entry = VaultEntryCreate(site_name=f"site{i}", site_password=password, master_password="audit-master")
+            await vault_service.create_vault_entry(db, entry, user.id)
+        # A blob that no longer decrypts is reported, not fatal
+        db.add(VaultEntry(user_id=user.id, site_name="broken", encrypted_password=encrypt_password("other-master", "x")))
+        await db.commit()
+        return user.id, user.email
+
+async def _audit_lines(user_id, master_password):
+    lines = [json.loads(line) async for chunk in audit_service.audit_vault(user_id, master_password) for line in chunk.splitlines()]
+    await async_engine.dispose()
+    return lines
+
+def _check_audit(lines):
+    entries, summary = lines[:-1], lines[-1]
+    assert [line["type"] for line in entries] == ["entry"] * 7
+    assert [line["id"] for line in entries] == sorted(line["id"] for line in entries)
+    broken = [line for line in entries if "error" in line]
+    assert len(broken) == 1 and set(broken[0]) == {"type", "id", "error"}
+    audited = [line for line in entries if "error" not in line]
+    for line in audited:
+        assert set(line) == {"type", "id", "site_name", "score", "feedback", "is_pwned", "pwned_count", "reuse_count"}
+    by_site = {line["site_name"]: line for line in audited}
+    assert [by_site[f"site{i}"]["reuse_count"] for i in (0, 2, 4)] == [3, 3, 3]
+    assert by_site["site3"]["reuse_count"] == by_site["legacy"]["reuse_count"] == 2
+    assert by_site["site1"]["reuse_count"] == 1 and not by_site["site1"]["is_pwned"]
+    assert by_site["site0"]["is_pwned"] and by_site["site0"]["pwned_count"] == 1000
+    assert summary == {
+        "type": "summary", "entries": 7, "unique_passwords": 3, "failed": 1,
+        "weak": 5, "pwned": 5, "reused": 5,
+    }
+
+def test_vault_audit():
+    print("\n[TEST] Vault Audit...")
+    Base.metadata.create_all(bind=engine)
+    lookups = []
+    original_pwned = pwned_service.check_pwned_password
+    original_batch = settings.AUDIT_BATCH_SIZE
+    pwned_service.check_pwned_password = lambda password: _fake_pwned(lookups, password)
+    # Small pages so duplicates span several of them
+    settings.AUDIT_BATCH_SIZE = 2
+    try:
+        user_id, email = asyncio.run(_seed_audit_user())
+        _check_audit(asyncio.run(_audit_lines(user_id, "audit-master")))
+        assert sorted(lookups) == ["Vq8#xLm2!pZr7@Tw", "hunter2", "letmein"]
+        print("  [PASS] Duplicates grouped across pages, each password checked once.")
+
+        token = security.create_access_token({"sub": email, "uid": user_id})
+        headers = {"Authorization": f"Bearer {token}"}
+        limiter.reset()
+        with TestClient(app) as client:
+            response = client.post("/api/v1/vault/audit", json={"master_password": "wrong"}, headers=headers)
+            assert response.status_code == 400
+            print("  [PASS] Wrong master password rejected with 400.")
+
+            response = client.post("/api/v1/vault/audit", json={"master_password": "audit-master"}, headers=headers)
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            assert response.text.endswith("\n")
+            _check_audit([json.loads(line) for line in response.text.splitlines()])
+            client.portal.call(async_engine.dispose)
+        limiter.reset()
+        print("  [PASS] POST /vault/audit streams NDJSON entry lines and a summary.")
     finally:
-        db.close()
+        pwned_service.check_pwned_password = original_pwned
+        settings.AUDIT_BATCH_SIZE = original_batch
+        audit_service.shutdown()
 
-async def main():
+def main():
     test_crypto()
+    test_envelope_crypto()
     test_health()
-    await test_pwned()
+    asyncio.run(test_pwned())
     test_vault_db()
+    test_vault_audit()
     print("\n[ALL TESTS PASSED] SecurePass Logic Verified.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
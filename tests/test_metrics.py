@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import tempfile
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+
+def test_histogram_render():
+    print("\n[TEST] Metrics Rendering...")
+    registry = metrics.Registry()
+    latency = registry.register(metrics.Histogram("t_seconds", "Test latency.", ("op",), buckets=(0.1, 1.0)))
+    calls = registry.register(metrics.Counter("t_total", "Test calls.", ("op",)))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, op='a"b')
+    calls.inc(op="x")
+    calls.inc(2, op="x")
+
+    text = registry.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{op="a\\"b",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="a\\"b",le="1.0"} 2' in text
+    assert 't_seconds_bucket{op="a\\"b",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="a\\"b"} 3' in text
+    assert 't_total{op="x"} 3.0' in text
+    print("  [PASS] Cumulative buckets, sums and escaped labels rendered.")
+
+def test_multiprocess_merge():
+    print("\n[TEST] Metrics Multiprocess Merge...")
+    previous = settings.METRICS_MULTIPROC_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        settings.METRICS_MULTIPROC_DIR = directory
+        try:
+            registry = metrics.Registry()
+            calls = registry.register(metrics.Counter("t_total", "Test calls.", ("op",)))
+            calls.inc(op="x")
+            # Snapshot of another worker
+            with open(os.path.join(directory, "metrics-1.json"), "w") as f:
+                json.dump({"t_total": [[["x"], 4.0], [["y"], 1.0]]}, f)
+            text = registry.render()
+        finally:
+            settings.METRICS_MULTIPROC_DIR = previous
+    assert 't_total{op="x"} 5.0' in text
+    assert 't_total{op="y"} 1.0' in text
+    print("  [PASS] Other workers' snapshots summed into the output.")
+
+def test_failed_statements():
+    print("\n[TEST] Failed Statement Timing...")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+    test_engine = create_engine("sqlite://")
+    metrics.instrument_engine(test_engine, "failing")
+    with test_engine.connect() as conn:
+        for _ in range(3):
+            try:
+                conn.execute(text("SELECT * FROM missing_table"))
+                assert False, "Statement should have failed"
+            except OperationalError:
+                pass
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert not any(key.startswith("metrics") for key in conn.info)
+    assert metrics.db_queries.snapshot()[("failing",)] == 4
+    assert sum(metrics.db_latency.snapshot()[("failing",)][:-1]) == 4
+    test_engine.dispose()
+    print("  [PASS] Failed statements timed without leaving state on the connection.")
+
+def test_metrics_endpoint():
+    print("\n[TEST] GET /metrics...")
+    client = TestClient(app)
+    client.get("/")
+    client.get("/no-such-route")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'securepass_http_requests_total{method="GET",route="/",status="200"}' in response.text
+    assert 'route="unmatched",status="404"' in response.text
+    assert "securepass_db_query_duration_seconds" in response.text
+    print("  [PASS] Requests recorded per route template.")
+
+if __name__ == "__main__":
+    test_histogram_render()
+    test_multiprocess_merge()
+    test_failed_statements()
+    test_metrics_endpoint()
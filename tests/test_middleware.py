@@ -0,0 +1,69 @@
+import sys
+import os
+import json
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware import CompressionMiddleware, SECURITY_HEADERS
+from app.main import app
+
+def _compression_app() -> FastAPI:
+    demo = FastAPI()
+    entries = [{"id": i, "site_name": f"site-{i}", "encrypted_password": "x" * 40} for i in range(200)]
+
+    @demo.get("/large")
+    def large():
+        return entries
+
+    @demo.get("/small")
+    def small():
+        return {"ok": True}
+
+    @demo.get("/stream")
+    def stream():
+        return StreamingResponse((json.dumps(entry) + "\n" for entry in entries), media_type="application/x-ndjson")
+
+    @demo.get("/binary")
+    def binary():
+        return Response(b"\0" * 4096, media_type="application/octet-stream")
+
+    demo.add_middleware(CompressionMiddleware)
+    return demo
+
+def test_security_headers():
+    print("\n[TEST] Security Headers...")
+    response = TestClient(app).get("/")
+    for name, value in SECURITY_HEADERS:
+        assert response.headers[name.decode()] == value.decode()
+    print("  [PASS] Precomputed headers added to responses.")
+
+def test_compression():
+    print("\n[TEST] Response Compression...")
+    client = TestClient(_compression_app())
+    gzip = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/large", headers=gzip)
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(response.content) / 4
+    assert len(response.json()) == 200
+    print(f"  [PASS] JSON body gzipped: {len(response.content)} -> {response.headers['content-length']} bytes.")
+
+    response = client.get("/stream", headers=gzip)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 200
+    print("  [PASS] Streaming body compressed chunk by chunk.")
+
+    assert "content-encoding" not in client.get("/small", headers=gzip).headers
+    assert "content-encoding" not in client.get("/binary", headers=gzip).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "gzip;q=0"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    print("  [PASS] Small, binary and not-accepted responses passed through.")
+
+if __name__ == "__main__":
+    test_security_headers()
+    test_compression()
@@ -0,0 +1,61 @@
+import sys
+import os
+import asyncio
+import secrets
+from datetime import timedelta
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi import HTTPException
+from app.api import deps
+from app.core import security
+from app.db.session import AsyncSessionLocal, async_engine, async_read_engine, engine, Base
+from app.db.models import User
+from app.services import principal_service
+
+def test_principal_cache():
+    print("\n[TEST] Principal Cache...")
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(_principal_flow())
+
+async def _principal_flow():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"principal-{secrets.token_hex(4)}@test.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        token = security.create_access_token(data={"sub": user.email, "uid": user.id})
+
+        # 1. First call verifies and loads; the second is a cache hit
+        principal = await deps.get_current_user(token)
+        assert principal.id == user.id and principal.email == user.email
+        assert principal_service.get_cached(token) == principal
+        print("  [PASS] Verified token cached.")
+
+        # 2. Committing a 2FA change drops the cached principal
+        user.totp_secret = "JBSWY3DPEHPK3PXP"
+        await db.commit()
+        assert principal_service.get_cached(token) is None
+        print("  [PASS] totp_secret change invalidates.")
+
+        # 3. Deactivated users are rejected on the next request
+        user.is_active = False
+        await db.commit()
+        try:
+            await deps.get_current_user(token)
+            assert False, "inactive user accepted"
+        except HTTPException as e:
+            assert e.status_code == 400
+        print("  [PASS] is_active change invalidates.")
+
+        # 4. Entries never outlive the token
+        expired = security.create_access_token(data={"sub": user.email, "uid": user.id}, expires_delta=timedelta(seconds=-1))
+        principal_service.cache(expired, principal, 0, principal_service.generation(user.id))
+        assert principal_service.get_cached(expired) is None
+        print("  [PASS] Expired token not cached.")
+
+    # Pooled connections are bound to this event loop
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+if __name__ == "__main__":
+    test_principal_cache()
@@ -0,0 +1,67 @@
+import sys
+import os
+import secrets
+import tempfile
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.db.session import engine, Base
+from app.main import app
+
+def _timings(response) -> dict:
+    spans = {}
+    for part in response.headers["server-timing"].split(", "):
+        name, dur = part.split(";")[:2]
+        spans[name] = float(dur.split("=")[1])
+    return spans
+
+def test_server_timing():
+    print("\n[TEST] Server-Timing Profiling...")
+    Base.metadata.create_all(bind=engine)
+    previous = settings.PROFILING_TOKEN, settings.PROFILING_CPROFILE_DIR, limiter.enabled
+    client = TestClient(profiling.ProfilingMiddleware(app))
+    with tempfile.TemporaryDirectory() as directory:
+        settings.PROFILING_TOKEN = "profile-secret"
+        settings.PROFILING_CPROFILE_DIR = directory
+        limiter.enabled = False
+        try:
+            email = f"profile-{secrets.token_hex(4)}@test.com"
+            password = "Correct-Horse-Battery-9"
+            assert client.post("/api/v1/auth/register", json={"email": email, "password": password}).status_code == 200
+
+            # 1. No header (or a wrong token): nothing added
+            response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+            assert "server-timing" not in response.headers
+            response = client.post("/api/v1/auth/login", data={"username": email, "password": password},
+                                   headers={"X-Profile": "wrong"})
+            assert "server-timing" not in response.headers
+            print("  [PASS] Unauthorized requests are not profiled.")
+
+            # 2. Authorized: spans for the DB and Argon2
+            response = client.post("/api/v1/auth/login", data={"username": email, "password": password},
+                                   headers={"X-Profile": "profile-secret"})
+            spans = _timings(response)
+            assert {"db", "crypto", "total"} <= set(spans)
+            assert spans["crypto"] <= spans["total"]
+            token = response.json()["access_token"]
+            print(f"  [PASS] Login breakdown: {response.headers['server-timing']}")
+
+            # 3. Auth dependency span and a cProfile capture
+            response = client.get("/api/v1/vault/", headers={
+                "Authorization": f"Bearer {token}", "X-Profile": "profile-secret", "X-Profile-Capture": "1",
+            })
+            assert response.status_code == 200
+            assert "auth" in _timings(response)
+            captures = [name for name in os.listdir(directory) if name.endswith(".prof")]
+            assert len(captures) == 1 and "GET-api_v1_vault" in captures[0]
+            print("  [PASS] Auth span recorded and cProfile capture written.")
+        finally:
+            settings.PROFILING_TOKEN, settings.PROFILING_CPROFILE_DIR, limiter.enabled = previous
+
+if __name__ == "__main__":
+    test_server_timing()
@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services import pwned_service
+
+PWNED = "password"
+SHA1 = hashlib.sha1(PWNED.encode('utf-8')).hexdigest().upper()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for api.pwnedpasswords.com/range/{prefix}."""
+    hits = []
+
+    def do_GET(self):
+        prefix = self.path.rsplit('/', 1)[-1]
+        StandInHandler.hits.append(prefix)
+        lines = ["0018A45C4D1DEF81644B54AB7F969B88D65:1", "00D4F6E8FA6EECAD2A3AA415EEC418D38EC:2"]
+        if prefix == SHA1[:5]:
+            lines.append(f"{SHA1[5:]}:9659365")
+        body = "\r\n".join(sorted(lines)).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_pwned_cache_against_stand_in():
+    print("\n[TEST] Pwned Service (local stand-in)...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_url = settings.PWNED_API_URL
+    settings.PWNED_API_URL = f"http://127.0.0.1:{server.server_port}"
+    StandInHandler.hits.clear()
+    pwned_service.clear_cache()
+
+    async def scenario():
+        await pwned_service.startup()
+        try:
+            # 1. Concurrent checks for one prefix share a single request
+            counts = await asyncio.gather(*[pwned_service.check_pwned_password(PWNED) for _ in range(10)])
+            assert counts == [9659365] * 10
+            assert StandInHandler.hits == [SHA1[:5]]
+            print("  [PASS] Single-flight de-duplication.")
+
+            # 2. Repeat lookups are served from the cache
+            assert await pwned_service.check_pwned_password(PWNED) == 9659365
+            assert len(StandInHandler.hits) == 1
+            print("  [PASS] Cached range reused.")
+
+            # 3. Unknown suffix in a fetched range
+            assert await pwned_service.check_pwned_password("x7Gq!v3#Lp9@") == 0
+            assert len(StandInHandler.hits) == 2
+            print("  [PASS] Unseen password reports 0.")
+        finally:
+            await pwned_service.shutdown()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        settings.PWNED_API_URL = original_url
+        pwned_service.clear_cache()
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_pwned_cache_against_stand_in()
+    print("\n[ALL TESTS PASSED] Pwned Cache Verified.")
@@ -0,0 +1,49 @@
+import sys
+import os
+import hashlib
+import tempfile
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.services.pwned_corpus import BreachCorpus, build_corpus, build_bloom
+
+def test_offline_corpus():
+    print("\n[TEST] Offline Breach Corpus...")
+    passwords = {f"password{i}": i + 1 for i in range(500)}
+    lines = sorted(f"{hashlib.sha1(p.encode()).hexdigest().upper()}:{c}" for p, c in passwords.items())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "dump.txt")
+        with open(source, "w") as f:
+            f.write("\r\n".join(lines) + "\r\n")
+
+        # 1. Build corpus + bloom filter
+        corpus_path = os.path.join(tmp, "pwned.bin")
+        bloom_path = os.path.join(tmp, "pwned.bloom")
+        assert build_corpus(source, corpus_path) == 500
+        build_bloom(corpus_path, bloom_path)
+        print("  [PASS] Corpus and bloom filter built.")
+
+        # 2. Lookups with and without the bloom filter
+        for bloom in (None, bloom_path):
+            corpus = BreachCorpus(corpus_path, bloom)
+            try:
+                for password, count in passwords.items():
+                    assert corpus.lookup_password(password) == count
+                assert corpus.lookup_password("not-in-the-corpus") == 0
+            finally:
+                corpus.close()
+        print("  [PASS] Hits return counts, misses return 0.")
+
+        # 3. Unsorted input is rejected
+        with open(source, "w") as f:
+            f.write("\n".join(reversed(lines)))
+        try:
+            build_corpus(source, corpus_path)
+            assert False, "Unsorted input accepted"
+        except ValueError:
+            print("  [PASS] Unsorted input rejected.")
+
+if __name__ == "__main__":
+    test_offline_corpus()
+    print("\n[ALL TESTS PASSED] Offline Corpus Verified.")
@@ -0,0 +1,61 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from limits.storage import storage_from_string
+from app.core.rate_limit_storage import SQLiteStorage
+
+def test_sqlite_rate_limit_storage():
+    print("\n[TEST] SQLite Rate Limit Storage...")
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{tmp}/ratelimit.db"
+        storage = storage_from_string(uri)
+        assert isinstance(storage, SQLiteStorage)
+        budget = parse("10/minute")
+
+        # 1. Costs are charged against one budget
+        limiter = SlidingWindowCounterRateLimiter(storage)
+        assert limiter.hit(budget, "client", cost=6)
+        assert not limiter.hit(budget, "client", cost=5)
+        assert limiter.hit(budget, "client", cost=4)
+        assert not limiter.hit(budget, "client")
+        assert limiter.hit(budget, "other-client")
+        print("  [PASS] Cost-weighted budget enforced.")
+
+        # 2. A second storage on the same file (another worker) sees the same counters
+        other = SlidingWindowCounterRateLimiter(SQLiteStorage(uri))
+        assert not other.hit(budget, "client")
+        assert other.get_window_stats(budget, "client").remaining == 0
+        print("  [PASS] Counters shared across storages.")
+
+        # 3. Concurrent hits never overshoot the limit
+        storage.reset()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            granted = sum(pool.map(lambda _: limiter.hit(budget, "burst"), range(50)))
+        assert granted == 10
+        print("  [PASS] No overshoot under concurrency.")
+
+        # 4. A write lock held elsewhere fails open after the short busy timeout
+        blocker = sqlite3.connect(f"{tmp}/ratelimit.db", isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        timeouts = storage.lock_timeouts
+        try:
+            started = time.perf_counter()
+            assert limiter.hit(budget, "locked-out")
+            assert time.perf_counter() - started < 0.5
+            assert storage.lock_timeouts == timeouts + 1
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+        assert limiter.get_window_stats(budget, "locked-out").remaining == 10
+        print("  [PASS] Lock contention admits instead of blocking.")
+
+if __name__ == "__main__":
+    test_sqlite_rate_limit_storage()
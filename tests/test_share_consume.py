@@ -0,0 +1,125 @@
+import sys
+import os
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+# Add project root to path
+sys.path.append(os.getcwd())
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.db.models import SharedSecret
+from app.db.session import Base, SessionLocal, engine
+from app.main import app
+from app.schemas.share import ShareCreate
+from app.services import share_service
+
+THREADS = 16
+
+def test_share_consumed_once_under_load():
+    print("\n[TEST] One-time Share Link Under Concurrency...")
+    Base.metadata.create_all(bind=engine)
+    # NullPool: every thread runs its own event loop, so connections can't be pooled across them
+    test_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool, connect_args={"timeout": 30})
+    sessions = async_sessionmaker(test_engine, expire_on_commit=False)
+
+    statements = []
+    event.listen(test_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async def create():
+        async with sessions() as db:
+            return (await share_service.create_shared_secret(db, ShareCreate(content="burn after reading", ttl_minutes=5)))["uuid"]
+
+    async def consume(secret_id):
+        async with sessions() as db:
+            return await share_service.access_shared_secret(db, secret_id)
+
+    for _ in range(5):
+        secret_id = asyncio.run(create())
+        statements.clear()
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            results = list(pool.map(lambda _: asyncio.run(consume(secret_id)), range(THREADS)))
+        winners = [content for content in results if content is not None]
+        assert len(winners) == 1, f"{len(winners)} readers got the secret"
+        consumes = [sql for sql in statements if "shared_secrets" in sql]
+        assert len(consumes) == THREADS and all(sql.lstrip().upper().startswith("DELETE") for sql in consumes)
+    print(f"  [PASS] Exactly one of {THREADS} concurrent readers got the secret, one statement each.")
+
+    asyncio.run(test_engine.dispose())
+
+def _share_files() -> set:
+    return set(os.listdir(settings.SHARE_FILE_DIR)) if os.path.isdir(settings.SHARE_FILE_DIR) else set()
+
+async def _download_then_disconnect(secret_id: str) -> None:
+    # The client is gone before the response starts: sending the headers fails
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": f"/api/v1/share/file/{secret_id}",
+        "raw_path": f"/api/v1/share/file/{secret_id}".encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("connection reset")
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        pass
+
+def test_file_share_limits_and_cleanup():
+    print("\n[TEST] File Share Limits and Cleanup...")
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    limiter.reset()
+    # Uploads go to a scratch directory; the rows they create are deleted at the end
+    original_dir = settings.SHARE_FILE_DIR
+    scratch = tempfile.TemporaryDirectory()
+    settings.SHARE_FILE_DIR = scratch.name
+    created = []
+    try:
+        # 1. TTLs are bounded, and a rejected request writes nothing
+        before = _share_files()
+        response = client.post("/api/v1/share/file", params={"ttl_minutes": 10 ** 9}, content=b"data")
+        assert response.status_code == 422
+        assert _share_files() == before
+        with pytest.raises(ValidationError):
+            ShareCreate(content="x", ttl_minutes=settings.SHARE_MAX_TTL_MINUTES + 1)
+        print("  [PASS] Out-of-range TTL rejected before any file is written.")
+
+        # 2. A client that disconnects before the download starts still burns the file
+        secret_id = client.post("/api/v1/share/file", content=b"payload").json()["uuid"]
+        created.append(secret_id)
+        assert f"{secret_id}.bin" in _share_files()
+        asyncio.run(_download_then_disconnect(secret_id))
+        assert f"{secret_id}.bin" not in _share_files()
+        assert client.get(f"/api/v1/share/file/{secret_id}").status_code == 404
+        print("  [PASS] Ciphertext deleted even though the stream never ran.")
+
+        # 3. Uploads are limited per client
+        responses = [client.post("/api/v1/share/file", content=b"x") for _ in range(10)]
+        created.extend(response.json()["uuid"] for response in responses if response.status_code == 200)
+        statuses = [response.status_code for response in responses]
+        assert statuses[-1] == 429 and statuses.count(200) == 9
+        print("  [PASS] Anonymous uploads rate limited.")
+    finally:
+        limiter.reset()
+        settings.SHARE_FILE_DIR = original_dir
+        scratch.cleanup()
+        with SessionLocal() as db:
+            db.query(SharedSecret).filter(SharedSecret.id.in_(created)).delete(synchronize_session=False)
+            db.commit()
+
+if __name__ == "__main__":
+    test_share_consumed_once_under_load()
+    test_file_share_limits_and_cleanup()
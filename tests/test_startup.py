@@ -0,0 +1,159 @@
+import sys
+import os
+import sqlite3
+import subprocess
+import tempfile
+# Add project root to path
+sys.path.append(os.getcwd())
+
+def _python(code: str, database: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "SECRET_KEY": "test", "DATABASE_URL": f"sqlite+aiosqlite:///{database}"}
+    return subprocess.run([sys.executable, "-c", code], cwd=os.getcwd(), env=env, capture_output=True, text=True)
+
+# Schema as created by the first release, before any column or index was added
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY, email VARCHAR, hashed_password VARCHAR,
+    is_active BOOLEAN, totp_secret VARCHAR
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE vault_entries (
+    id INTEGER NOT NULL PRIMARY KEY, site_name VARCHAR, site_url VARCHAR,
+    encrypted_password VARCHAR NOT NULL, user_id INTEGER REFERENCES users (id),
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME
+);
+CREATE INDEX ix_vault_entries_id ON vault_entries (id);
+CREATE INDEX ix_vault_entries_site_name ON vault_entries (site_name);
+CREATE TABLE shared_secrets (
+    id VARCHAR NOT NULL PRIMARY KEY, encrypted_content VARCHAR NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), expires_at DATETIME
+);
+INSERT INTO users (id, email, hashed_password, is_active) VALUES (1, 'old@test.com', 'x', 1);
+INSERT INTO vault_entries (site_name, encrypted_password, user_id, created_at) VALUES
+    ('GitHub', 'blob', 1, '2024-01-01 10:00:00'), ('GitLab', 'blob', 1, '2024-01-01 10:00:00'),
+    ('Gitea', 'blob', 1, '2024-01-01 10:00:00'), ('Bitbucket', 'blob', 1, '2024-01-02 09:30:00'),
+    ('Codeberg', 'blob', 1, NULL);
+"""
+
+def test_upgrade_baseline_database():
+    print("\n[TEST] Schema Upgrade...")
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "baseline.db")
+        with sqlite3.connect(database) as conn:
+            conn.executescript(BASELINE_SCHEMA)
+
+        # Twice: the upgrade must be idempotent
+        for _ in range(2):
+            proc = _python("import runpy; runpy.run_module('app.db.init_db', run_name='__main__')", database)
+            assert proc.returncode == 0, proc.stderr
+
+        conn = sqlite3.connect(database)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        assert "vault_key_wrapped" in columns
+        assert "file_size" in {row[1] for row in conn.execute("PRAGMA table_info(shared_secrets)")}
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"ix_vault_entries_user_id_id", "ix_vault_entries_user_id_updated_at_id", "ix_shared_secrets_expires_at"} <= indexes
+        print("  [PASS] Missing columns and indexes added to a baseline database.")
+
+        # The upgraded database serves the current queries
+        proc = _python(
+            "import asyncio\n"
+            "from sqlalchemy import select\n"
+            "from app.db.session import AsyncSessionLocal\n"
+            "from app.db.models import User\n"
+            "async def main():\n"
+            "    async with AsyncSessionLocal() as db:\n"
+            "        user = (await db.execute(select(User))).scalar_one()\n"
+            "        print(user.email, user.vault_key_wrapped)\n"
+            "asyncio.run(main())\n",
+            database,
+        )
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.strip() == "old@test.com None"
+        print("  [PASS] Existing users load after the upgrade.")
+
+        # Entries with NULL updated_at were backfilled, so paging by it visits each once
+        assert conn.execute("SELECT COUNT(*) FROM vault_entries WHERE updated_at IS NULL").fetchone()[0] == 0
+        proc = _python(
+            "import asyncio\n"
+            "from app.db.session import AsyncSessionLocal\n"
+            "from app.services import vault_service\n"
+            "async def main():\n"
+            "    async with AsyncSessionLocal() as db:\n"
+            "        for descending in (False, True):\n"
+            "            seen, cursor = [], None\n"
+            "            while True:\n"
+            "                rows, cursor = await vault_service.list_vault_entries_page(\n"
+            "                    db, 1, limit=2, after=cursor, order_by='updated_at', descending=descending)\n"
+            "                seen += [row.id for row in rows]\n"
+            "                if cursor is None:\n"
+            "                    break\n"
+            "            print(*seen)\n"
+            "asyncio.run(main())\n",
+            database,
+        )
+        assert proc.returncode == 0, proc.stderr
+        ascending, descending = proc.stdout.strip().splitlines()
+        assert ascending.split() == ["1", "2", "3", "4", "5"]
+        assert descending.split() == ["5", "4", "3", "2", "1"]
+        print("  [PASS] Pre-existing entries page by updated_at without gaps.")
+
+# Search index as first shipped: external content, no owner column
+OLD_SEARCH_INDEX = """
+CREATE VIRTUAL TABLE vault_entries_fts USING fts5(
+    site_name, site_url, content='vault_entries', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER vault_entries_fts_ai AFTER INSERT ON vault_entries BEGIN
+    INSERT INTO vault_entries_fts(rowid, site_name, site_url) VALUES (new.id, new.site_name, new.site_url);
+END;
+INSERT INTO vault_entries_fts(vault_entries_fts) VALUES ('rebuild');
+"""
+
+def test_upgrade_search_index():
+    print("\n[TEST] Search Index Upgrade...")
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "search.db")
+        with sqlite3.connect(database) as conn:
+            conn.executescript(BASELINE_SCHEMA + OLD_SEARCH_INDEX)
+
+        proc = _python("import runpy; runpy.run_module('app.db.init_db', run_name='__main__')", database)
+        assert proc.returncode == 0, proc.stderr
+
+        conn = sqlite3.connect(database)
+        assert "owner" in {row[1] for row in conn.execute("PRAGMA table_info(vault_entries_fts)")}
+        owned = conn.execute("SELECT COUNT(*) FROM vault_entries_fts WHERE vault_entries_fts MATCH 'owner : \"#1#\"'")
+        assert owned.fetchone()[0] == 5
+        # The recreated triggers index new rows with their owner
+        with conn:
+            conn.execute("INSERT INTO vault_entries (site_name, encrypted_password, user_id) VALUES ('Gitee', 'blob', 1)")
+        found = conn.execute(
+            "SELECT COUNT(*) FROM vault_entries_fts WHERE vault_entries_fts MATCH 'owner : \"#1#\" AND \"itee\"'"
+        )
+        assert found.fetchone()[0] == 1
+        print("  [PASS] Search index from before the owner column rebuilt and backfilled.")
+
+def test_cold_import():
+    print("\n[TEST] Cold Import...")
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "startup.db")
+
+        # 1. Importing the app runs no DDL and does not load zxcvbn
+        proc = _python("import sys, app.main; print('zxcvbn' in sys.modules)", database)
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.strip() == "False"
+        assert not os.path.exists(database) or not sqlite3.connect(database).execute(
+            "SELECT name FROM sqlite_master WHERE name = 'users'").fetchall()
+        print("  [PASS] No schema creation or zxcvbn load at import.")
+
+        # 2. The schema command creates the tables
+        proc = _python("import runpy; runpy.run_module('app.db.init_db', run_name='__main__')", database)
+        assert proc.returncode == 0, proc.stderr
+        tables = {row[0] for row in sqlite3.connect(database).execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"users", "vault_entries", "shared_secrets"} <= tables
+        print("  [PASS] python -m app.db.init_db creates the schema.")
+
+if __name__ == "__main__":
+    test_cold_import()
+    test_upgrade_baseline_database()
+    test_upgrade_search_index()
@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+import base64
+import json
+import secrets
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.crypto import encrypt_with_data_key, generate_data_key
+from app.db.session import AsyncSessionLocal, async_engine, async_read_engine, engine, Base
+from app.db.models import User
+from app.services import transfer_service, vault_service
+
+async def _chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+async def _collect(records):
+    return [record async for record in records]
+
+def test_incremental_parsers():
+    print("\n[TEST] Import Parsers...")
+    csv_data = 'name,url,password\nGitHub,https://github.com,"p,1"\n"Multi\nLine",,"say ""hi"""\n'.encode()
+    for size in (1, 7, 1024):
+        records = asyncio.run(_collect(transfer_service.iter_csv_records(_chunked(csv_data, size))))
+        assert records == [
+            {"name": "GitHub", "url": "https://github.com", "password": "p,1"},
+            {"name": "Multi\nLine", "url": "", "password": 'say "hi"'},
+        ]
+    print("  [PASS] CSV parsed across arbitrary chunk boundaries.")
+
+    items = [{"name": f"site{i}", "password": "pé" * i} for i in range(20)]
+    for data in (json.dumps(items).encode(), "\n".join(json.dumps(item) for item in items).encode()):
+        assert asyncio.run(_collect(transfer_service.iter_json_records(_chunked(data, 5)))) == items
+    print("  [PASS] JSON array and NDJSON parsed incrementally.")
+
+def test_import_export():
+    print("\n[TEST] Vault Import / Export...")
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(_import_export_flow())
+
+async def _import_export_flow():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"import-{secrets.token_hex(4)}@test.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+
+        csv_data = "name,url,password\n" + "".join(f"site{i},https://s{i}.com,pw{i}\n" for i in range(25)) + "broken,,\n"
+        records = transfer_service.iter_csv_records(_chunked(csv_data.encode(), 64))
+        result = await transfer_service.import_entries(db, user.id, records, "import-master")
+        assert result["imported"] == 25 and result["failed"] == 1
+        assert result["errors"] == [{"row": 26, "error": "Missing password"}]
+        print("  [PASS] Imported in batches with per-row errors.")
+
+        exported = "".join([chunk async for chunk in transfer_service.export_entries(user.id)])
+        rows = json.loads(exported)
+        assert len(rows) == 25 and "pw0" not in exported
+        revealed = await vault_service.reveal_vault_entries(db, [rows[0]["id"]], "import-master", user.id)
+        assert revealed[0]["entry"]["decrypted_password"] == "pw0"
+        print("  [PASS] Export streams encrypted entries.")
+
+        # Exported rows re-import as-is without the master password
+        result = await transfer_service.import_entries(db, user.id, transfer_service.iter_json_records(_chunked(exported.encode(), 100)))
+        assert result["imported"] == 25 and result["failed"] == 0
+        print("  [PASS] Export round-trips through import.")
+
+        # Ciphertext that is not a vault blob is rejected per row
+        unmarked = base64.urlsafe_b64encode(b"\x02" * 60).decode()
+        bad = [{"name": "typo", "encrypted_password": "hunter2"}, {"name": "short", "encrypted_password": "AQID"},
+               {"name": "junk", "encrypted_password": "not base64 at all!" * 4},
+               {"name": "unmarked", "encrypted_password": unmarked}, rows[0]]
+        result = await transfer_service.import_entries(db, user.id, transfer_service.iter_json_records(_chunked(json.dumps(bad).encode(), 100)))
+        assert result["imported"] == 1 and [error["row"] for error in result["errors"]] == [1, 2, 3, 4]
+        print("  [PASS] Malformed encrypted_password rows rejected.")
+
+        # With the master password, ciphertext must decrypt under this vault's key
+        foreign = encrypt_with_data_key(generate_data_key(), "someone else's")
+        mixed = [{"name": "foreign", "encrypted_password": foreign}, rows[1], {"name": "plain", "password": "pw"}]
+        result = await transfer_service.import_entries(
+            db, user.id, transfer_service.iter_json_records(_chunked(json.dumps(mixed).encode(), 100)), "import-master")
+        assert result["imported"] == 2 and result["errors"] == [
+            {"row": 1, "error": "encrypted_password does not decrypt with this vault's key"}]
+        print("  [PASS] Ciphertext authenticated against the data key.")
+
+    # Pooled connections are bound to this event loop
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+if __name__ == "__main__":
+    test_incremental_parsers()
+    test_import_export()